@@ -3,11 +3,26 @@ Production security configuration and hardening.
 """
 
 import os
+import re
 import secrets
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from urllib.parse import urlparse
 
+_SUSPICIOUS_REQUEST_PATTERNS = (
+    '<script>', 'javascript:', 'eval(', 'document.cookie',
+    'window.location', 'document.write', 'innerHTML',
+    '../', '..\\', '/etc/passwd', 'cmd.exe'
+)
+# One case-insensitive scan; the group name maps a match back to its pattern
+_SUSPICIOUS_REQUEST_RE = re.compile(
+    '|'.join(
+        f'(?P<p{index}>{re.escape(pattern)})'
+        for index, pattern in enumerate(_SUSPICIOUS_REQUEST_PATTERNS)
+    ),
+    re.IGNORECASE
+)
+
 
 @dataclass
 class SecurityConfig:
@@ -158,16 +173,10 @@ class SecurityMiddleware:
             return False, f"Content exceeds maximum length of {self.config.max_content_length} characters"
         
         # Check for suspicious patterns
-        suspicious_patterns = [
-            '<script>', 'javascript:', 'eval(', 'document.cookie',
-            'window.location', 'document.write', 'innerHTML',
-            '../', '..\\', '/etc/passwd', 'cmd.exe'
-        ]
-        
-        content_lower = content.lower()
-        for pattern in suspicious_patterns:
-            if pattern in content_lower:
-                return False, f"Suspicious pattern detected: {pattern}"
+        match = _SUSPICIOUS_REQUEST_RE.search(content)
+        if match:
+            pattern = _SUSPICIOUS_REQUEST_PATTERNS[int(match.lastgroup[1:])]
+            return False, f"Suspicious pattern detected: {pattern}"
         
         return True, None
     
@@ -1,7 +1,8 @@
 """Data models for styling configuration using Pydantic for validation."""
 
 from typing import Dict, Any, Optional, Annotated, ClassVar
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, StringConstraints, field_validator
+import functools
 import json
 
 
@@ -16,7 +17,10 @@ class StyleConfig(BaseModel):
     letter_spacing: int = Field(default=0, ge=-2, le=5)
     
     # Colors
-    text_color: str = Field(default="#333333", pattern=r"^#[0-9a-fA-F]{6}$")  # Changed default to #333333
+    # Lowercased and pattern-checked in one pydantic-core string validator
+    text_color: Annotated[str, StringConstraints(to_lower=True)] = Field(
+        default="#333333", pattern=r"^#[0-9a-fA-F]{6}$"
+    )  # Changed default to #333333
     background_color: str = Field(default="#ffffff", pattern=r"^#[0-9a-fA-F]{6}$")
     accent_color: str = Field(default="#4285f4", pattern=r"^#[0-9a-fA-F]{6}$")
     
@@ -44,15 +48,8 @@ class StyleConfig(BaseModel):
     
     @classmethod
     def from_json(cls, json_str: str) -> 'StyleConfig':
-        """Create configuration from JSON string."""
-        data = json.loads(json_str)
-        return cls(**data)
-    
-    @field_validator('text_color', mode='before')
-    def normalize_text_color(cls, v):
-        if isinstance(v, str):
-            return v.lower()
-        return v
+        """Create configuration from JSON string, parsed and validated in one pass."""
+        return cls.model_validate_json(json_str)
 
 
 class FileUploadModel(BaseModel):
@@ -121,4 +118,10 @@ class SecurityConfig(BaseModel):
     
     model_config = {
         "validate_assignment": True
-    }
\ No newline at end of file
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_default_security_config() -> SecurityConfig:
+    """Get the shared default SecurityConfig; treat it as read-only."""
+    return SecurityConfig()
@@ -1,18 +1,22 @@
 """Template system data models and validation."""
 
-from typing import Dict, List, Any, Optional, Union, ClassVar
-from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Annotated, Dict, List, Any, Mapping, Optional, ClassVar
+from pydantic import BaseModel, Field, PrivateAttr, StringConstraints
 from enum import Enum
 import json
+import re
+import sys
+from collections import OrderedDict
 from datetime import datetime
+from types import MappingProxyType
 
 
 # Import HTMLSanitizer for security
 def _get_html_sanitizer():
-    """Get HTMLSanitizer instance lazily to avoid circular imports."""
+    """Get the shared HTMLSanitizer lazily to avoid circular imports."""
     try:
-        from utils.sanitizers import HTMLSanitizer
-        return HTMLSanitizer()
+        from utils.sanitizers import get_default_sanitizer
+        return get_default_sanitizer()
     except ImportError:
         # Fallback sanitization using simple regex
         import re
@@ -32,6 +36,18 @@ def _get_html_sanitizer():
         return FallbackSanitizer()
 
 
+# Splits an HTML template into alternating literal chunks and placeholder keys
+_PLACEHOLDER_RE = re.compile(r'\{\{([\w-]+)\}\}')
+
+
+# Placeholder keys and template IDs: letters, digits, underscores and hyphens
+# with at least one letter or digit, lowercased; pydantic-core runs the check
+_Identifier = Annotated[str, StringConstraints(
+    to_lower=True,
+    pattern=r'^[\p{L}\p{N}_-]*[\p{L}\p{N}][\p{L}\p{N}_-]*$'
+)]
+
+
 class TemplateCategory(str, Enum):
     """Template categories for organization."""
     BUSINESS = "business"
@@ -44,7 +60,7 @@ class TemplateCategory(str, Enum):
 
 class ContentPlaceholder(BaseModel):
     """Content placeholder configuration."""
-    key: str = Field(..., description="Unique placeholder key")
+    key: _Identifier = Field(..., description="Unique placeholder key")
     label: str = Field(..., description="Human-readable label")
     description: str = Field(..., description="Description of expected content")
     placeholder_text: str = Field(..., description="Default placeholder text")
@@ -52,13 +68,6 @@ class ContentPlaceholder(BaseModel):
     required: bool = Field(default=True, description="Whether this placeholder is required")
     max_length: Optional[int] = Field(None, description="Maximum content length")
     validation_pattern: Optional[str] = Field(None, description="Regex pattern for validation")
-    
-    @field_validator('key')
-    def validate_key(cls, v):
-        """Validate placeholder key format."""
-        if not v.replace('_', '').replace('-', '').isalnum():
-            raise ValueError("Placeholder key must be alphanumeric with underscores/hyphens")
-        return v.lower()
 
 
 class StyleOverride(BaseModel):
@@ -86,7 +95,7 @@ class TemplateMetadata(BaseModel):
 
 class Template(BaseModel):
     """Complete template configuration."""
-    id: str = Field(..., description="Unique template identifier")
+    id: _Identifier = Field(..., description="Unique template identifier")
     metadata: TemplateMetadata = Field(..., description="Template metadata")
     html_template: str = Field(..., description="HTML template with placeholders")
     style_overrides: List[StyleOverride] = Field(default_factory=list, description="Style customizations")
@@ -94,36 +103,116 @@ class Template(BaseModel):
     default_style_config: Dict[str, Any] = Field(default_factory=dict, description="Default style configuration")
     sample_content: Dict[str, str] = Field(default_factory=dict, description="Sample content for placeholders")
     
-    @field_validator('id')
-    def validate_id(cls, v):
-        """Validate template ID format."""
-        if not v.replace('_', '').replace('-', '').isalnum():
-            raise ValueError("Template ID must be alphanumeric with underscores/hyphens")
-        return v.lower()
+    # Memoized derived data, keyed on metadata.modified_date. Assigning a
+    # field or copying the template resets it; in-place edits of nested
+    # values (a placeholder's pattern, a tag list) need the date bumped
+    RENDER_CACHE_SIZE: ClassVar[int] = 32
+    _render_cache: Dict[Any, str] = PrivateAttr(default_factory=OrderedDict)
+    _required_cache: Optional[tuple] = PrivateAttr(default=None)
+    _compiled_cache: Optional[tuple] = PrivateAttr(default=None)
+    _constraints_cache: Optional[tuple] = PrivateAttr(default=None)
+    _search_text_cache: Optional[tuple] = PrivateAttr(default=None)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            if name != 'metadata':
+                self.metadata.modified_date = datetime.now()
+            self._clear_caches()
+    
+    def model_copy(
+        self, *, update: Optional[Mapping[str, Any]] = None, deep: bool = False
+    ) -> 'Template':
+        """Copy the template; the copy starts with empty caches of its own."""
+        copied = super().model_copy(update=update, deep=deep)
+        copied._clear_caches()
+        return copied
+    
+    def _clear_caches(self) -> None:
+        """Drop memoized derived data (rebinding, since copies share the objects)."""
+        self._render_cache = OrderedDict()
+        self._required_cache = None
+        self._compiled_cache = None
+        self._constraints_cache = None
+        self._search_text_cache = None
     
     def render(self, content_data: Dict[str, str], style_config: Optional[Dict[str, Any]] = None) -> str:
         """Render template with provided content."""
-        html = self.html_template
+        try:
+            cache_key = (self.metadata.modified_date, tuple(sorted(content_data.items())))
+            hash(cache_key)
+        except TypeError:
+            # Unhashable content values; render without caching
+            return self._render_uncached(content_data)
+        
+        cached = self._render_cache.get(cache_key)
+        if cached is None:
+            cached = self._render_uncached(content_data)
+            if len(self._render_cache) >= self.RENDER_CACHE_SIZE:
+                # popitem is a single atomic call, so concurrent renders can evict
+                try:
+                    self._render_cache.popitem(last=False)
+                except KeyError:
+                    pass
+            self._render_cache[cache_key] = cached
+        return cached
+    
+    def _compiled(self) -> tuple:
+        """
+        Get the substitution plan for html_template.
+        
+        Returns:
+            Tuple of (parts, defaults) where parts alternates literal chunks
+            and placeholder keys, and defaults maps each key to its text
+        """
+        version = self.metadata.modified_date
+        if self._compiled_cache is None or self._compiled_cache[0] != version:
+            # Keys are interned so the plan, the defaults and the per-render
+            # value lookups all share one string object per placeholder
+            defaults = {}
+            for placeholder in self.placeholders:
+                defaults.setdefault(sys.intern(placeholder.key), placeholder.placeholder_text)
+            
+            chunks = _PLACEHOLDER_RE.split(self.html_template)
+            parts = [chunks[0]]
+            for key, literal in zip(chunks[1::2], chunks[2::2]):
+                if key in defaults:
+                    parts.append(sys.intern(key))
+                    parts.append(literal)
+                else:
+                    # Unknown placeholders stay in the output verbatim
+                    parts[-1] += f"{{{{{key}}}}}" + literal
+            
+            # Style overrides go into the literal chunks once, not per render
+            if self.style_overrides:
+                style_close = f"<style>{self._generate_override_css()}</style></head>"
+                parts[::2] = [literal.replace("</head>", style_close) for literal in parts[::2]]
+            
+            self._compiled_cache = (version, (tuple(parts), MappingProxyType(defaults)))
+        return self._compiled_cache[1]
+    
+    @property
+    def default_content(self) -> Mapping[str, str]:
+        """Read-only mapping of each placeholder key to its default text."""
+        return self._compiled()[1]
+    
+    def _render_uncached(self, content_data: Dict[str, str]) -> str:
+        """Substitute sanitized content into the HTML template."""
+        parts, defaults = self._compiled()
         
         # Get sanitizer instance
         sanitizer = _get_html_sanitizer()
         
-        # Replace placeholders with sanitized content
-        for placeholder in self.placeholders:
-            placeholder_value = content_data.get(placeholder.key, placeholder.placeholder_text)
-            # Sanitize the placeholder value to prevent XSS
-            if placeholder_value:
-                sanitized_value = sanitizer.sanitize(str(placeholder_value))
-            else:
-                sanitized_value = ""
-            html = html.replace(f"{{{{{placeholder.key}}}}}", sanitized_value)
-        
-        # Apply style overrides
-        if self.style_overrides:
-            style_css = self._generate_override_css()
-            html = html.replace("</head>", f"<style>{style_css}</style></head>")
+        # Sanitize each placeholder value once to prevent XSS
+        values = {}
+        for key, default in defaults.items():
+            placeholder_value = content_data.get(key, default)
+            values[key] = sanitizer.sanitize(str(placeholder_value)) if placeholder_value else ""
         
-        return html
+        return "".join([
+            values[part] if i % 2 else part
+            for i, part in enumerate(parts)
+        ])
     
     def _generate_override_css(self) -> str:
         """Generate CSS from style overrides."""
@@ -135,28 +224,55 @@ class Template(BaseModel):
     
     def get_required_placeholders(self) -> List[ContentPlaceholder]:
         """Get list of required placeholders."""
-        return [p for p in self.placeholders if p.required]
+        version = self.metadata.modified_date
+        if self._required_cache is None or self._required_cache[0] != version:
+            self._required_cache = (version, tuple(p for p in self.placeholders if p.required))
+        return list(self._required_cache[1])
+    
+    def _constraints(self) -> tuple:
+        """
+        Get the per-placeholder validation plan.
+        
+        Returns:
+            Tuple of (key, label, required, max_length, compiled pattern or None)
+        """
+        version = self.metadata.modified_date
+        if self._constraints_cache is None or self._constraints_cache[0] != version:
+            self._constraints_cache = (version, tuple(
+                (p.key, p.label, p.required, p.max_length,
+                 re.compile(p.validation_pattern) if p.validation_pattern else None)
+                for p in self.placeholders
+            ))
+        return self._constraints_cache[1]
+    
+    def _search_text(self) -> str:
+        """Lowercased name, description and tags, NUL-separated so a query cannot span fields."""
+        version = self.metadata.modified_date
+        if self._search_text_cache is None or self._search_text_cache[0] != version:
+            metadata = self.metadata
+            self._search_text_cache = (version, "\0".join(
+                (metadata.name, metadata.description, *metadata.tags)
+            ).lower())
+        return self._search_text_cache[1]
     
     def validate_content(self, content_data: Dict[str, str]) -> List[str]:
         """Validate provided content against template requirements."""
         errors = []
         
-        for placeholder in self.placeholders:
-            if placeholder.required and placeholder.key not in content_data:
-                errors.append(f"Required placeholder '{placeholder.label}' is missing")
+        for key, label, required, max_length, pattern in self._constraints():
+            content = content_data.get(key)
+            if content is None and key not in content_data:
+                if required:
+                    errors.append(f"Required placeholder '{label}' is missing")
+                continue
+            
+            # Length validation
+            if max_length and len(content) > max_length:
+                errors.append(f"'{label}' exceeds maximum length of {max_length}")
             
-            if placeholder.key in content_data:
-                content = content_data[placeholder.key]
-                
-                # Length validation
-                if placeholder.max_length and len(content) > placeholder.max_length:
-                    errors.append(f"'{placeholder.label}' exceeds maximum length of {placeholder.max_length}")
-                
-                # Pattern validation
-                if placeholder.validation_pattern:
-                    import re
-                    if not re.match(placeholder.validation_pattern, content):
-                        errors.append(f"'{placeholder.label}' does not match required format")
+            # Pattern validation
+            if pattern is not None and not pattern.match(content):
+                errors.append(f"'{label}' does not match required format")
         
         return errors
     
@@ -166,9 +282,8 @@ class Template(BaseModel):
     
     @classmethod
     def from_json(cls, json_str: str) -> 'Template':
-        """Create template from JSON."""
-        data = json.loads(json_str)
-        return cls(**data)
+        """Create template from JSON, parsed and validated in one pydantic-core pass."""
+        return cls.model_validate_json(json_str)
 
 
 class TemplateLibrary(BaseModel):
@@ -205,22 +320,11 @@ class TemplateLibrary(BaseModel):
     def search_templates(self, query: str) -> List[Template]:
         """Search templates by name, description, or tags."""
         query_lower = query.lower()
-        results = []
-        
-        for template in self.templates.values():
-            # Search in name and description
-            if (query_lower in template.metadata.name.lower() or 
-                query_lower in template.metadata.description.lower()):
-                results.append(template)
-                continue
-            
-            # Search in tags
-            for tag in template.metadata.tags:
-                if query_lower in tag.lower():
-                    results.append(template)
-                    break
-        
-        return results
+        # One substring scan per template over its prebuilt search text
+        return [
+            template for template in self.templates.values()
+            if query_lower in template._search_text()
+        ]
     
     def get_template_stats(self) -> Dict[str, Any]:
         """Get library statistics."""
@@ -2,6 +2,7 @@
 
 import logging
 import base64
+import re
 from io import BytesIO
 from typing import Tuple, Optional, Dict, Any
 import streamlit as st
@@ -17,6 +18,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# First number in a heading style name ("heading 2" -> 2)
+_HEADING_LEVEL_RE = re.compile(r'\d+')
+
 
 class DOCXProcessor:
     """Advanced DOCX processor with formatting preservation."""
@@ -223,10 +227,9 @@ class DOCXProcessor:
         """Extract heading level from style name."""
         try:
             # Look for numbers in style name
-            import re
-            numbers = re.findall(r'\\d+', style_name)
-            if numbers:
-                level = int(numbers[0])
+            match = _HEADING_LEVEL_RE.search(style_name)
+            if match:
+                level = int(match.group())
                 return min(max(level, 1), 6)  # Clamp between 1-6
         except:
             pass
@@ -2,11 +2,13 @@
 
 import base64
 import logging
+import mmap
 import time
+from contextlib import nullcontext
 from io import BytesIO
 from PIL import Image
 from typing import Tuple, Optional
-from utils.sanitizers import HTMLSanitizer, ContentValidator
+from utils.sanitizers import HTMLSanitizer, ContentValidator, get_default_sanitizer
 from utils.validators import FileValidator, TextValidator
 from models.style_models import SecurityConfig
 from services.document_processors.pdf_processor import PDFProcessor
@@ -18,12 +20,22 @@ from utils.performance_monitor import get_performance_monitor, monitor_performan
 logger = logging.getLogger(__name__)
 
 
+def _file_buffer(file_obj):
+    """Return the file's bytes, as a zero-copy view where the object allows it."""
+    if isinstance(file_obj, mmap.mmap):
+        return file_obj
+    if hasattr(file_obj, 'getbuffer'):  # BytesIO, and Streamlit's UploadedFile
+        return file_obj.getbuffer()
+    file_obj.seek(0)
+    return file_obj.read()
+
+
 class FileProcessor:
     """Secure file processor with validation and sanitization."""
     
     def __init__(self, sanitizer: Optional[HTMLSanitizer] = None, validator: Optional[FileValidator] = None):
         """Initialize file processor with dependencies."""
-        self.sanitizer = sanitizer or HTMLSanitizer()
+        self.sanitizer = sanitizer or get_default_sanitizer()
         self.file_validator = validator or FileValidator()  # Changed from validator to file_validator
         self.content_validator = ContentValidator()
         self.text_validator = TextValidator()  # Add text validator
@@ -72,9 +84,13 @@ class FileProcessor:
                     'category': self._get_file_category(file_path.suffix.lower().lstrip('.'))
                 }
                 
-                # Open and read the file
-                with open(uploaded_file, 'rb') as f:
-                    success, result = self._process_file_content(f, file_info)
+                # Map the file so hashing and decoding read the page cache
+                # instead of a heap copy; an empty file cannot be mapped
+                with open(uploaded_file, 'rb') as f, (
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    if file_info['size'] else nullcontext(f)
+                ) as file_obj:
+                    success, result = self._process_file_content(file_obj, file_info)
                     return {
                         'success': success,
                         'content' if success else 'error': result
@@ -139,9 +155,7 @@ class FileProcessor:
         
         try:
             # Generate cache key from file content
-            uploaded_file.seek(0)
-            file_content = uploaded_file.read()
-            file_hash = generate_content_hash(file_content)
+            file_hash = generate_content_hash(_file_buffer(uploaded_file))
             uploaded_file.seek(0)  # Reset for processing
             
             # Check cache first
@@ -232,7 +246,7 @@ class FileProcessor:
         """Process text-based files."""
         try:
             # Read and decode content
-            content = file_obj.read().decode('utf-8')
+            content = str(_file_buffer(file_obj), 'utf-8')
             
             # Validate text content
             is_valid, error_msg = self.text_validator.validate_text_input(content)
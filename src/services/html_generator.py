@@ -1,15 +1,36 @@
 """HTML generation service with modern templates."""
 
+import functools
 import logging
 import time
-from typing import Dict, Any
+from typing import Tuple
 from models.style_models import StyleConfig
-from utils.cache_manager import StreamlitCacheManager, generate_content_hash, generate_style_hash
+from utils.cache_manager import StreamlitCacheManager, generate_content_hash
 from utils.logger import get_enhanced_logger, log_performance
 from utils.performance_monitor import monitor_performance
 
 logger = logging.getLogger(__name__)
 
+# Security headers emitted as meta tags in every generated document
+_SECURITY_HEADERS = '\n    '.join([
+    '<meta http-equiv="Content-Security-Policy" content="default-src \'self\'; '
+    'style-src \'self\' \'unsafe-inline\' https://fonts.googleapis.com; '
+    'font-src \'self\' https://fonts.gstatic.com; script-src \'self\' \'unsafe-inline\'; '
+    'img-src \'self\' data: https:; connect-src \'self\';">',
+    '<meta http-equiv="X-Content-Type-Options" content="nosniff">',
+    '<meta http-equiv="X-Frame-Options" content="DENY">',
+    '<meta http-equiv="X-XSS-Protection" content="1; mode=block">',
+    '<meta http-equiv="Referrer-Policy" content="strict-origin-when-cross-origin">',
+    '<meta http-equiv="Permissions-Policy" content="ambient-light-sensor=(), battery=(), '
+    'camera=(), display-capture=(), document-domain=(), encrypted-media=(), '
+    'execution-while-not-rendered=(), execution-while-out-of-viewport=(), fullscreen=(), '
+    'geolocation=(), gyroscope=(), layout-animations=(), legacy-image-formats=(), '
+    'magnetometer=(), microphone=(), midi=(), navigation-override=(), oversized-images=(), '
+    'payment=(), picture-in-picture=(), publickey-credentials-get=(), speaker-selection=(), '
+    'sync-xhr=(), unoptimized-images=(), unsized-media=(), usb=(), screen-wake-lock=(), '
+    'web-share=(), xr-spatial-tracking=()">'
+])
+
 
 class HTMLGenerator:
     """Professional HTML document generator."""
@@ -39,9 +60,11 @@ class HTMLGenerator:
         start_time = time.time()
         
         try:
-            # Generate cache keys
+            # Generate cache keys; the config is serialized once and also keys
+            # the memoized document shell (same digest as generate_style_hash)
+            config_json = self.style_config.model_dump_json()
             content_hash = generate_content_hash(content)
-            style_hash = generate_style_hash(self.style_config)
+            style_hash = generate_content_hash(config_json)
             document_hash = generate_content_hash(f"{content_hash}_{style_hash}")
             
             # Check cache first
@@ -55,42 +78,9 @@ class HTMLGenerator:
                 )
                 return cached_html
             
-            # Generate CSS styles
-            css_styles = self._generate_css_styles()
-            # Add all required security headers as meta tags
-            security_headers = [
-                '<meta http-equiv="Content-Security-Policy" content="default-src \'self\'; style-src \'self\' \'unsafe-inline\' https://fonts.googleapis.com; font-src \'self\' https://fonts.gstatic.com; script-src \'self\' \'unsafe-inline\'; img-src \'self\' data: https:; connect-src \'self\';">',
-                '<meta http-equiv="X-Content-Type-Options" content="nosniff">',
-                '<meta http-equiv="X-Frame-Options" content="DENY">',
-                '<meta http-equiv="X-XSS-Protection" content="1; mode=block">',
-                '<meta http-equiv="Referrer-Policy" content="strict-origin-when-cross-origin">',
-                '<meta http-equiv="Permissions-Policy" content="ambient-light-sensor=(), battery=(), camera=(), display-capture=(), document-domain=(), encrypted-media=(), execution-while-not-rendered=(), execution-while-out-of-viewport=(), fullscreen=(), geolocation=(), gyroscope=(), layout-animations=(), legacy-image-formats=(), magnetometer=(), microphone=(), midi=(), navigation-override=(), oversized-images=(), payment=(), picture-in-picture=(), publickey-credentials-get=(), speaker-selection=(), sync-xhr=(), unoptimized-images=(), unsized-media=(), usb=(), screen-wake-lock=(), web-share=(), xr-spatial-tracking=()">'
-            ]
-            security_headers_str = '\n    '.join(security_headers)
-            html_document = f"""<!DOCTYPE html>
-<html lang=\"en\">
-<head>
-    <meta charset=\"UTF-8\">
-    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">
-    <meta name=\"description\" content=\"Professional HTML document generated with HTML Formatter Pro\">
-    <meta name=\"generator\" content=\"HTML Formatter Pro\">
-    {security_headers_str}
-    <title>Professional Document</title>
-    <link href=\"https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Roboto:wght@300;400;500;700&family=Poppins:wght@300;400;500;600;700&display=swap\" rel=\"stylesheet\">
-    <style>
-        {css_styles}
-    </style>
-</head>
-<body>
-    <div class=\"document-container\">
-        {content}
-    </div>
-    <!-- Performance and accessibility enhancements -->
-    <script>
-        {self._generate_javascript()}
-    </script>
-</body>
-</html>"""
+            # Everything around the content depends only on the style config
+            head, tail = _shell_for_config(config_json)
+            html_document = "".join((head, content, tail))
             
             # Cache the generated HTML
             self.cache_manager.cache_html_output(document_hash, html_document, ttl=3600)  # 1 hour
@@ -118,20 +108,27 @@ class HTMLGenerator:
             return f"<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n    <meta charset=\"UTF-8\">\n    <title>Document</title>\n</head>\n<body>\n    {content}\n</body>\n</html>"
     
     def _generate_css_styles(self) -> str:
-        """Generate CSS styles based on configuration."""
+        """Generate CSS styles based on configuration, memoized per distinct config."""
+        return _css_for_config(self.style_config.model_dump_json())
+    
+    @staticmethod
+    def _build_css_styles(style_config: StyleConfig) -> str:
+        """Build CSS styles for a style configuration."""
         # Shadow styles
         shadow_styles = """
             box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1), 0 10px 20px rgba(0, 0, 0, 0.05);
             transition: all 0.3s ease;
-        """ if self.style_config.add_shadows else ""
+        """ if style_config.add_shadows else ""
         
         # Gradient background
-        if self.style_config.add_gradients:
+        if style_config.add_gradients:
+            background = style_config.background_color
+            background_fade = HTMLGenerator._hex_to_rgba(background, 0.9)
             gradient_bg = f"""
-                background: linear-gradient(145deg, {self.style_config.background_color} 0%, {self._hex_to_rgba(self.style_config.background_color, 0.9)} 100%);
+                background: linear-gradient(145deg, {background} 0%, {background_fade} 100%);
             """
         else:
-            gradient_bg = f"background-color: {self.style_config.background_color};"
+            gradient_bg = f"background-color: {style_config.background_color};"
         
         # Typography scale
         typography_scale = """
@@ -174,7 +171,7 @@ class HTMLGenerator:
                 overflow-x: auto;
                 margin: 1.5em 0;
             }
-        """ if self.style_config.modern_typography else ""
+        """ if style_config.modern_typography else ""
         
         # Responsive styles
         responsive_styles = """
@@ -193,14 +190,16 @@ class HTMLGenerator:
                     font-size: calc(var(--base-font-size) * 0.85);
                 }
             }
-        """ if self.style_config.responsive_design else ""
+        """ if style_config.responsive_design else ""
+        
+        highlight_color = HTMLGenerator._hex_to_rgba(style_config.accent_color, 0.2)
         
         return f"""
         :root {{
-            --text-color: {self.style_config.text_color};
-            --background-color: {self.style_config.background_color};
-            --accent-color: {self.style_config.accent_color};
-            --base-font-size: {self.style_config.font_size}px;
+            --text-color: {style_config.text_color};
+            --background-color: {style_config.background_color};
+            --accent-color: {style_config.accent_color};
+            --base-font-size: {style_config.font_size}px;
         }}
         
         * {{
@@ -208,18 +207,18 @@ class HTMLGenerator:
         }}
         
         body {{
-            font-family: {self.style_config.font_family};
+            font-family: {style_config.font_family};
             font-size: var(--base-font-size);
-            font-weight: {self.style_config.font_weight};
+            font-weight: {style_config.font_weight};
             color: var(--text-color);
             {gradient_bg}
-            text-align: {self.style_config.text_align};
-            line-height: {self.style_config.line_height};
-            letter-spacing: {self.style_config.letter_spacing}px;
-            margin: {self.style_config.margin}px;
-            padding: {self.style_config.padding}px;
-            border-radius: {self.style_config.border_radius}px;
-            max-width: {self.style_config.max_width}px;
+            text-align: {style_config.text_align};
+            line-height: {style_config.line_height};
+            letter-spacing: {style_config.letter_spacing}px;
+            margin: {style_config.margin}px;
+            padding: {style_config.padding}px;
+            border-radius: {style_config.border_radius}px;
+            max-width: {style_config.max_width}px;
             margin-left: auto;
             margin-right: auto;
             {shadow_styles}
@@ -232,7 +231,7 @@ class HTMLGenerator:
         .document-container {{
             {gradient_bg}
             padding: 2rem;
-            border-radius: {self.style_config.border_radius}px;
+            border-radius: {style_config.border_radius}px;
             {shadow_styles}
         }}
         
@@ -247,21 +246,21 @@ class HTMLGenerator:
         }}
         
         .highlight {{
-            background: linear-gradient(120deg, transparent 0%, {self._hex_to_rgba(self.style_config.accent_color, 0.2)} 100%);
+            background: linear-gradient(120deg, transparent 0%, {highlight_color} 100%);
             padding: 0.2em 0.4em;
             border-radius: 4px;
         }}
         
         .callout {{
-            background: {self._hex_to_rgba(self.style_config.accent_color, 0.1)};
-            border: 1px solid {self._hex_to_rgba(self.style_config.accent_color, 0.3)};
+            background: {HTMLGenerator._hex_to_rgba(style_config.accent_color, 0.1)};
+            border: 1px solid {HTMLGenerator._hex_to_rgba(style_config.accent_color, 0.3)};
             border-radius: 8px;
             padding: 1rem;
             margin: 1.5rem 0;
         }}
         
         ::selection {{
-            background: {self._hex_to_rgba(self.style_config.accent_color, 0.3)};
+            background: {HTMLGenerator._hex_to_rgba(style_config.accent_color, 0.3)};
             color: white;
         }}
         
@@ -305,7 +304,8 @@ class HTMLGenerator:
         }}
         """
     
-    def _generate_javascript(self) -> str:
+    @staticmethod
+    def _generate_javascript() -> str:
         """Generate minimal JavaScript for enhancements."""
         return """
         // Smooth loading animation
@@ -346,10 +346,49 @@ class HTMLGenerator:
         });
         """
     
-    def _hex_to_rgba(self, hex_color: str, alpha: float = 1.0) -> str:
+    @staticmethod
+    def _hex_to_rgba(hex_color: str, alpha: float = 1.0) -> str:
         """Convert hex color to rgba with alpha."""
         hex_color = hex_color.lstrip('#')
         if len(hex_color) == 6:
             r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
             return f"rgba({r}, {g}, {b}, {alpha})"
-        return hex_color
\ No newline at end of file
+        return hex_color
+
+
+@functools.lru_cache(maxsize=128)
+def _css_for_config(config_json: str) -> str:
+    """Build the stylesheet for a serialized StyleConfig; repeated configs hit the cache."""
+    return HTMLGenerator._build_css_styles(StyleConfig.model_validate_json(config_json))
+
+
+@functools.lru_cache(maxsize=128)
+def _shell_for_config(config_json: str) -> Tuple[str, str]:
+    """Build the document head and tail around the content slot for a serialized StyleConfig."""
+    css_styles = _css_for_config(config_json)
+    head = f"""<!DOCTYPE html>
+<html lang=\"en\">
+<head>
+    <meta charset=\"UTF-8\">
+    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">
+    <meta name=\"description\" content=\"Professional HTML document generated with HTML Formatter Pro\">
+    <meta name=\"generator\" content=\"HTML Formatter Pro\">
+    {_SECURITY_HEADERS}
+    <title>Professional Document</title>
+    <link href=\"https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Roboto:wght@300;400;500;700&family=Poppins:wght@300;400;500;600;700&display=swap\" rel=\"stylesheet\">
+    <style>
+        {css_styles}
+    </style>
+</head>
+<body>
+    <div class=\"document-container\">
+        """
+    tail = f"""
+    </div>
+    <!-- Performance and accessibility enhancements -->
+    <script>
+        {HTMLGenerator._generate_javascript()}
+    </script>
+</body>
+</html>"""
+    return head, tail
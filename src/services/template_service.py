@@ -58,12 +58,17 @@ class TemplateService:
         """Search templates by name, description, or tags."""
         return self.template_library.search_templates(query)
     
-    def render_template(self, template_id: str, content_data: Dict[str, str]) -> Optional[str]:
-        """Render a template with provided content."""
+    def render_template(
+        self, template_id: str, content_data: Optional[Dict[str, str]] = None
+    ) -> Optional[str]:
+        """Render a template with provided content, or its defaults when omitted."""
         template = self.get_template(template_id)
         if not template:
             return None
         
+        if content_data is None:
+            content_data = template.default_content
+        
         # Validate content
         validation_errors = template.validate_content(content_data)
         if validation_errors:
@@ -72,6 +77,14 @@ class TemplateService:
         
         return template.render(content_data)
     
+    def render_many(
+        self, template_id: str, content_list: List[Optional[Dict[str, str]]]
+    ) -> List[Optional[str]]:
+        """Render a template once per content dict, preserving order."""
+        # Rendering is pure-Python string work, so worker threads would only
+        # contend for the GIL
+        return [self.render_template(template_id, content) for content in content_list]
+    
     # Business Templates
     def _add_business_letter_template(self):
         """Add professional business letter template."""
@@ -179,7 +179,8 @@ class PreviewComponent:
                 
                 # Check for common HTML elements
                 elements = ['p', 'h1', 'h2', 'h3', 'img', 'a', 'div']
-                found_elements = [elem for elem in elements if f'<{elem}' in content.lower()]
+                content_lower = content.lower()
+                found_elements = [elem for elem in elements if f'<{elem}' in content_lower]
                 if found_elements:
                     st.write(f"• Elements: {', '.join(found_elements)}")
             
@@ -3,10 +3,10 @@
 import streamlit as st
 import logging
 from typing import Optional
-from models.style_models import StyleConfig, SecurityConfig
+from models.style_models import StyleConfig, get_default_security_config
 from services.file_processor import FileProcessor
 from services.html_generator import HTMLGenerator
-from utils.sanitizers import HTMLSanitizer, ContentValidator
+from utils.sanitizers import ContentValidator, get_default_sanitizer
 from utils.validators import FileValidator, TextValidator
 from ui.components.style_sidebar import StyleSidebar
 from ui.components.file_uploader import FileUploaderComponent
@@ -21,9 +21,10 @@ class MainPage:
     
     def __init__(self):
         """Initialize main page with all dependencies."""
-        # Initialize security components
-        self.security_config = SecurityConfig()
-        self.sanitizer = HTMLSanitizer(self.security_config)
+        # Initialize security components; Streamlit builds a page per rerun,
+        # so the config and sanitizer (with its result cache) are shared
+        self.security_config = get_default_security_config()
+        self.sanitizer = get_default_sanitizer()
         self.content_validator = ContentValidator(self.security_config)
         self.file_validator = FileValidator()
         self.text_validator = TextValidator()
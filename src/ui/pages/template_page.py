@@ -1,6 +1,7 @@
 """Template management page for creating and editing document templates."""
 
 import streamlit as st
+import streamlit.components.v1 as components
 import json
 from typing import Dict, List, Optional
 from models.template_models import Template, TemplateCategory
@@ -9,6 +10,15 @@ from utils.logger import get_enhanced_logger
 
 logger = get_enhanced_logger(__name__)
 
+# Height of the sandboxed iframe used for rendered template previews
+PREVIEW_HEIGHT = 800
+
+
+@st.cache_data(hash_funcs={Template: lambda t: f"{t.id}:{t.metadata.modified_date}"})
+def _render_sample_content(template: Template) -> str:
+    """Render a template with its sample content (cached per template revision)."""
+    return template.render(template.sample_content)
+
 
 class TemplatePage:
     """Template management interface."""
@@ -199,7 +209,7 @@ class TemplatePage:
                 
                 # Preview
                 with st.expander("👁️ Document Preview", expanded=True):
-                    st.markdown(rendered_html, unsafe_allow_html=True)
+                    components.html(rendered_html, height=PREVIEW_HEIGHT, scrolling=True)
                 
                 # Download options
                 col1, col2, col3 = st.columns(3)
@@ -283,8 +293,8 @@ class TemplatePage:
         st.subheader(f"👁️ Preview: {template.metadata.name}")
         
         if template.sample_content:
-            rendered_html = template.render(template.sample_content)
-            st.markdown(rendered_html, unsafe_allow_html=True)
+            rendered_html = _render_sample_content(template)
+            components.html(rendered_html, height=PREVIEW_HEIGHT, scrolling=True)
         else:
             st.info("No sample content available for this template.")
     
@@ -3,8 +3,10 @@
 import hashlib
 import json
 import logging
+import threading
 import time
-from typing import Any, Optional, Union, Dict
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional, Union, Dict
 from pathlib import Path
 import streamlit as st
 
@@ -24,16 +26,34 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+class _Entry(NamedTuple):
+    """In-memory cache entry."""
+    value: Any
+    deadline: int  # time.monotonic_ns()
+    ttl: float
+
+
 class CacheManager:
     """Multi-level cache manager with fallback strategies."""
     
-    def __init__(self, cache_dir: Optional[str] = None, redis_url: Optional[str] = None):
+    __slots__ = (
+        'cache_dir', '_lock', 'max_memory_entries', 'memory_cache',
+        'disk_cache', 'redis_cache', 'stats'
+    )
+    
+    def __init__(self, cache_dir: Optional[str] = None, redis_url: Optional[str] = None,
+                 max_memory_entries: int = 10000):
         """Initialize cache manager with multiple storage backends."""
         self.cache_dir = Path(cache_dir or "cache")
         self.cache_dir.mkdir(exist_ok=True)
         
+        # The manager is shared across Streamlit session threads; this lock
+        # guards the memory cache and statistics
+        self._lock = threading.RLock()
+        self.max_memory_entries = max_memory_entries
+        
         # Cache levels
-        self.memory_cache = {}  # Level 1: In-memory
+        self.memory_cache = OrderedDict()  # Level 1: In-memory LRU
         self.disk_cache = None  # Level 2: Disk-based
         self.redis_cache = None  # Level 3: Redis (optional)
         
@@ -55,9 +75,8 @@ class CacheManager:
                 logger.warning(f"Failed to initialize Redis cache: {str(e)}")
                 self.redis_cache = None
         
-        # Cache statistics
+        # Cache statistics; total hits are derived from the per-level counts
         self.stats = {
-            'hits': 0,
             'misses': 0,
             'memory_hits': 0,
             'disk_hits': 0,
@@ -69,27 +88,29 @@ class CacheManager:
         cache_key = self._normalize_key(key)
         
         # Level 1: Memory cache
-        if cache_key in self.memory_cache:
-            entry = self.memory_cache[cache_key]
-            if not self._is_expired(entry):
-                self.stats['hits'] += 1
-                self.stats['memory_hits'] += 1
-                logger.debug(f"Cache hit (memory): {cache_key}")
-                return entry['value']
-            else:
+        with self._lock:
+            entry = self.memory_cache.get(cache_key)
+            if entry is not None:
+                if not self._is_expired(entry):
+                    self.memory_cache.move_to_end(cache_key)
+                    self.stats['memory_hits'] += 1
+                    logger.debug(f"Cache hit (memory): {cache_key}")
+                    return entry.value
                 del self.memory_cache[cache_key]
         
         # Level 2: Disk cache
         if self.disk_cache:
             try:
-                entry = self.disk_cache.get(cache_key)
-                if entry and not self._is_expired(entry):
+                stored = self.disk_cache.get(cache_key)
+                remaining = self._remaining_ttl(stored) if stored else 0
+                if remaining > 0:
                     # Promote to memory cache
-                    self.memory_cache[cache_key] = entry
-                    self.stats['hits'] += 1
-                    self.stats['disk_hits'] += 1
+                    entry = self._memory_entry(stored['value'], remaining, stored['ttl'])
+                    with self._lock:
+                        self._store_memory(cache_key, entry)
+                        self.stats['disk_hits'] += 1
                     logger.debug(f"Cache hit (disk): {cache_key}")
-                    return entry['value']
+                    return stored['value']
             except Exception as e:
                 logger.warning(f"Disk cache get error: {str(e)}")
         
@@ -98,29 +119,35 @@ class CacheManager:
             try:
                 entry_json = self.redis_cache.get(cache_key)
                 if entry_json:
-                    entry = json.loads(entry_json)
-                    if not self._is_expired(entry):
+                    stored = json.loads(entry_json)
+                    remaining = self._remaining_ttl(stored)
+                    if remaining > 0:
                         # Promote to memory and disk cache
-                        self.memory_cache[cache_key] = entry
+                        entry = self._memory_entry(stored['value'], remaining, stored['ttl'])
+                        with self._lock:
+                            self._store_memory(cache_key, entry)
+                            self.stats['redis_hits'] += 1
                         if self.disk_cache:
-                            self.disk_cache.set(cache_key, entry)
-                        self.stats['hits'] += 1
-                        self.stats['redis_hits'] += 1
+                            self.disk_cache.set(cache_key, stored, expire=remaining)
                         logger.debug(f"Cache hit (Redis): {cache_key}")
-                        return entry['value']
+                        return stored['value']
             except Exception as e:
                 logger.warning(f"Redis cache get error: {str(e)}")
         
         # Cache miss
-        self.stats['misses'] += 1
+        with self._lock:
+            self.stats['misses'] += 1
         logger.debug(f"Cache miss: {cache_key}")
         return default
     
-    def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
-        """Set value in all available cache levels."""
+    def set(self, key: str, value: Any, ttl: float = 3600) -> bool:
+        """Set value in all available cache levels; ttl is in seconds and may be fractional."""
         cache_key = self._normalize_key(key)
         
-        entry = {
+        entry = self._memory_entry(value, ttl, ttl)
+        
+        # Persistent levels outlive this process, so they keep a wall-clock timestamp
+        stored = {
             'value': value,
             'timestamp': time.time(),
             'ttl': ttl
@@ -130,7 +157,8 @@ class CacheManager:
         
         # Level 1: Memory cache
         try:
-            self.memory_cache[cache_key] = entry
+            with self._lock:
+                self._store_memory(cache_key, entry)
             success = True
             logger.debug(f"Cache set (memory): {cache_key}")
         except Exception as e:
@@ -139,7 +167,7 @@ class CacheManager:
         # Level 2: Disk cache
         if self.disk_cache:
             try:
-                self.disk_cache.set(cache_key, entry, expire=ttl)
+                self.disk_cache.set(cache_key, stored, expire=ttl)
                 logger.debug(f"Cache set (disk): {cache_key}")
             except Exception as e:
                 logger.warning(f"Disk cache set error: {str(e)}")
@@ -147,8 +175,8 @@ class CacheManager:
         # Level 3: Redis cache
         if self.redis_cache:
             try:
-                entry_json = json.dumps(entry)
-                self.redis_cache.setex(cache_key, ttl, entry_json)
+                entry_json = json.dumps(stored)
+                self.redis_cache.psetex(cache_key, max(int(ttl * 1000), 1), entry_json)
                 logger.debug(f"Cache set (Redis): {cache_key}")
             except Exception as e:
                 logger.warning(f"Redis cache set error: {str(e)}")
@@ -161,9 +189,9 @@ class CacheManager:
         success = False
         
         # Remove from memory
-        if cache_key in self.memory_cache:
-            del self.memory_cache[cache_key]
-            success = True
+        with self._lock:
+            if self.memory_cache.pop(cache_key, None) is not None:
+                success = True
         
         # Remove from disk
         if self.disk_cache:
@@ -185,7 +213,8 @@ class CacheManager:
         """Clear all cache levels."""
         try:
             # Clear memory
-            self.memory_cache.clear()
+            with self._lock:
+                self.memory_cache.clear()
             
             # Clear disk
             if self.disk_cache:
@@ -204,29 +233,33 @@ class CacheManager:
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
-        total_requests = self.stats['hits'] + self.stats['misses']
-        hit_rate = (self.stats['hits'] / total_requests * 100) if total_requests > 0 else 0
+        with self._lock:
+            stats = dict(self.stats)
+            memory_size = len(self.memory_cache)
+        
+        hits = stats['memory_hits'] + stats['disk_hits'] + stats['redis_hits']
+        total_requests = hits + stats['misses']
+        hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
         
         return {
-            **self.stats,
+            'hits': hits,
+            **stats,
             'total_requests': total_requests,
             'hit_rate': round(hit_rate, 2),
-            'memory_size': len(self.memory_cache),
+            'memory_size': memory_size,
             'disk_available': self.disk_cache is not None,
             'redis_available': self.redis_cache is not None
         }
     
     def cleanup_expired(self) -> int:
         """Remove expired entries from memory cache."""
-        expired_keys = []
-        current_time = time.time()
-        
-        for key, entry in self.memory_cache.items():
-            if self._is_expired(entry, current_time):
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del self.memory_cache[key]
+        with self._lock:
+            expired_keys = [
+                key for key, entry in self.memory_cache.items() if self._is_expired(entry)
+            ]
+            
+            for key in expired_keys:
+                del self.memory_cache[key]
         
         logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
         return len(expired_keys)
@@ -236,25 +269,44 @@ class CacheManager:
         # Create a hash for very long keys
         if len(key) > 250:
             return hashlib.sha256(key.encode()).hexdigest()
+        # Fast path: keys built by the helpers below are already canonical
+        if ' ' not in key and key.islower():
+            return key
         return key.replace(' ', '_').lower()
     
-    def _is_expired(self, entry: Dict[str, Any], current_time: Optional[float] = None) -> bool:
-        """Check if cache entry is expired."""
-        if current_time is None:
-            current_time = time.time()
-        
-        return (current_time - entry['timestamp']) > entry['ttl']
+    def _store_memory(self, cache_key: str, entry: _Entry) -> None:
+        """Insert into the memory cache, evicting the LRU entry if full (caller holds the lock)."""
+        if cache_key in self.memory_cache:
+            self.memory_cache.move_to_end(cache_key)
+        elif len(self.memory_cache) >= self.max_memory_entries:
+            self.memory_cache.popitem(last=False)
+        self.memory_cache[cache_key] = entry
+    
+    def _memory_entry(self, value: Any, remaining: float, ttl: float) -> _Entry:
+        """Build a memory cache entry with a precomputed monotonic deadline."""
+        return _Entry(value, time.monotonic_ns() + int(remaining * 1_000_000_000), ttl)
+    
+    def _remaining_ttl(self, stored: Dict[str, Any]) -> float:
+        """Get seconds left on a persisted (wall-clock) cache entry."""
+        return stored['timestamp'] + stored['ttl'] - time.time()
+    
+    def _is_expired(self, entry: _Entry) -> bool:
+        """Check if memory cache entry is expired."""
+        return entry.deadline <= time.monotonic_ns()
 
 
 class StreamlitCacheManager:
-    """Streamlit-specific cache manager using session state."""
+    """Streamlit-specific cache manager backed by the process-wide cache.
+    
+    The underlying ``CacheManager`` (and its disk/Redis handles) is shared
+    across all sessions via ``get_cache_manager``, so the memory cache is
+    cross-session. Keys are content hashes, which makes sharing safe; callers
+    that need per-session isolation must prefix keys with the session ID.
+    """
     
     def __init__(self):
         """Initialize Streamlit cache manager."""
-        if 'cache_manager' not in st.session_state:
-            st.session_state.cache_manager = CacheManager()
-        
-        self.cache = st.session_state.cache_manager
+        self.cache = get_cache_manager()
     
     def cache_file_content(self, file_hash: str, content: str, ttl: int = 1800) -> bool:
         """Cache processed file content."""
@@ -294,8 +346,9 @@ def generate_content_hash(content: Union[str, bytes]) -> str:
 
 def generate_style_hash(style_config) -> str:
     """Generate hash for style configuration."""
-    if hasattr(style_config, 'model_dump'):
-        config_str = json.dumps(style_config.model_dump(), sort_keys=True)
+    if hasattr(style_config, 'model_dump_json'):
+        # Serialized in pydantic-core; field order is fixed by the model class
+        config_str = style_config.model_dump_json()
     elif hasattr(style_config, 'dict'):  # Fallback for older Pydantic versions
         config_str = json.dumps(style_config.dict(), sort_keys=True)
     else:
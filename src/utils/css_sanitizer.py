@@ -2,64 +2,139 @@
 
 import logging
 import re
+from functools import lru_cache
 from typing import Dict, List, Optional, Set
 import tinycss2
+from tinycss2.serializer import serialize_identifier
 from tinycss2.ast import QualifiedRule, AtRule, Declaration
 
 logger = logging.getLogger(__name__)
 
 
+# Allowed CSS properties (whitelist approach)
+_ALLOWED_PROPERTIES = frozenset({
+    # Typography
+    'color', 'font-family', 'font-size', 'font-weight', 'font-style',
+    'line-height', 'letter-spacing', 'text-align', 'text-decoration',
+    'text-transform', 'text-indent', 'word-spacing',
+    
+    # Layout and positioning
+    'margin', 'margin-top', 'margin-right', 'margin-bottom', 'margin-left',
+    'padding', 'padding-top', 'padding-right', 'padding-bottom', 'padding-left',
+    'border', 'border-radius', 'width', 'height', 'max-width', 'max-height',
+    'min-width', 'min-height', 'display', 'overflow', 'overflow-x', 'overflow-y',
+    
+    # Visual effects
+    'background', 'background-color', 'background-image', 'background-size',
+    'background-position', 'background-repeat', 'opacity', 'box-shadow',
+    'border-color', 'border-style', 'border-width',
+    
+    # Flexbox and grid (safe subset)
+    'flex', 'flex-direction', 'justify-content', 'align-items', 'align-content',
+    'flex-wrap', 'gap',
+    
+    # Transitions and animations (limited)
+    'transition', 'transform'
+})
+
+# Dangerous CSS patterns to block
+_DANGEROUS_PATTERNS = (
+    r'javascript\s*:',
+    r'expression\s*\(',
+    r'@import',
+    r'@media\s+.*\(\s*device',
+    r'behavior\s*:',
+    r'-moz-binding',
+    r'data\s*:.*script',
+    r'vbscript\s*:',
+    r'mocha\s*:',
+    r'livescript\s*:',
+    r'url\s*\(\s*["\']?\s*data\s*:.*script'
+)
+_DANGEROUS_RE = re.compile('|'.join(_DANGEROUS_PATTERNS), re.IGNORECASE)
+
+# The same rules split for scanning: plain substrings checked against the
+# lowercased input, plus a residual regex for the whitespace-separated and
+# open-ended forms the substrings cannot express.
+_DANGEROUS_LITERALS = (
+    'javascript:', 'expression(', '@import', 'behavior:', '-moz-binding',
+    'vbscript:', 'mocha:', 'livescript:'
+)
+_DANGEROUS_RESIDUAL_RE = re.compile('|'.join((
+    r'(?:java|vb|live)script\s+:|mocha\s+:|behavior\s+:|expression\s+\(',
+    r'@media\s+.*\(\s*device',
+    r'data\s*:.*script'
+)), re.IGNORECASE)
+
+_DANGEROUS_SELECTOR_RE = re.compile('|'.join((
+    r'javascript\s*:',
+    r'expression\s*\(',
+    r'@import',
+    r'url\s*\(\s*["\']?\s*javascript'
+)), re.IGNORECASE)
+
+# URL validation pattern
+_SAFE_URL_RE = re.compile(r'^https?://[^\s<>"\']+$|^data:image/[^;]+;base64,[A-Za-z0-9+/=]+$')
+_URL_RE = re.compile(r'url\s*\(\s*["\']?([^)]+?)["\']?\s*\)', re.IGNORECASE)
+# C0/C1 control characters and BOM, stripped with str.translate
+_CTRL_DELETE_TABLE = dict.fromkeys(
+    list(range(0x00, 0x20)) + list(range(0x7f, 0xa0)) + [0xfeff], None
+)
+_HEX_DIGITS = frozenset('0123456789abcdef')
+_RGB_COLOR_RE = re.compile(r'^rgba?\s*\(\s*\d+\s*,\s*\d+\s*,\s*\d+\s*(?:,\s*[0-9.]+)?\s*\)$')
+
+# Named colors (basic set)
+_NAMED_COLORS = frozenset({
+    'white', 'black', 'red', 'green', 'blue', 'yellow', 'orange', 'purple',
+    'pink', 'brown', 'gray', 'grey', 'transparent', 'inherit', 'initial'
+})
+
+# Short inline styles made only of these characters tokenize to plain
+# idents, numbers and delimiters (no strings, functions, escapes,
+# comments or blocks), so they can be sanitized without tinycss2
+_SIMPLE_INLINE_RE = re.compile(r'[A-Za-z0-9_\-.,%#:;/ \t\n]*')
+_FAST_PATH_MAX_LENGTH = 256
+
+# Opening/closing delimiters for tinycss2 simple blocks
+_BLOCK_DELIMITERS = {
+    '() block': ('(', ')'),
+    '[] block': ('[', ']'),
+    '{} block': ('{', '}'),
+}
+
+# Results for inputs up to this length are memoized (style="" values repeat a lot)
+_CACHE_MAX_INPUT_LENGTH = 8192
+_CACHE_SIZE = 4096
+_DECLS_CACHE_SIZE = 1024
+
+
 class CSSSanitizer:
     """Secure CSS sanitizer for style attributes and stylesheets."""
     
     def __init__(self):
         """Initialize CSS sanitizer with security rules."""
-        # Allowed CSS properties (whitelist approach)
-        self.allowed_properties = {
-            # Typography
-            'color', 'font-family', 'font-size', 'font-weight', 'font-style',
-            'line-height', 'letter-spacing', 'text-align', 'text-decoration',
-            'text-transform', 'text-indent', 'word-spacing',
-            
-            # Layout and positioning
-            'margin', 'margin-top', 'margin-right', 'margin-bottom', 'margin-left',
-            'padding', 'padding-top', 'padding-right', 'padding-bottom', 'padding-left',
-            'border', 'border-radius', 'width', 'height', 'max-width', 'max-height',
-            'min-width', 'min-height', 'display', 'overflow', 'overflow-x', 'overflow-y',
-            
-            # Visual effects
-            'background', 'background-color', 'background-image', 'background-size',
-            'background-position', 'background-repeat', 'opacity', 'box-shadow',
-            'border-color', 'border-style', 'border-width',
-            
-            # Flexbox and grid (safe subset)
-            'flex', 'flex-direction', 'justify-content', 'align-items', 'align-content',
-            'flex-wrap', 'gap',
-            
-            # Transitions and animations (limited)
-            'transition', 'transform'
-        }
-        
-        # Dangerous CSS patterns to block
-        self.dangerous_patterns = [
-            r'javascript\s*:',
-            r'expression\s*\(',
-            r'@import',
-            r'@media\s+.*\(\s*device',
-            r'behavior\s*:',
-            r'-moz-binding',
-            r'data\s*:.*script',
-            r'vbscript\s*:',
-            r'mocha\s*:',
-            r'livescript\s*:',
-            r'url\s*\(\s*["\']?\s*data\s*:.*script'
-        ]
+        # Rules are module-level constants; instances only bind them
+        self.allowed_properties = _ALLOWED_PROPERTIES
+        self.dangerous_patterns = _DANGEROUS_PATTERNS
+        self.dangerous_regex = _DANGEROUS_RE
+        self._dangerous_literals = _DANGEROUS_LITERALS
+        self._dangerous_residual_regex = _DANGEROUS_RESIDUAL_RE
+        self.safe_url_pattern = _SAFE_URL_RE
         
-        # Compile patterns for performance
-        self.dangerous_regex = re.compile('|'.join(self.dangerous_patterns), re.IGNORECASE)
+        self._dangerous_selector_regex = _DANGEROUS_SELECTOR_RE
+        self._url_pattern = _URL_RE
+        self._ctrl_delete_table = _CTRL_DELETE_TABLE
+        self._hex_digits = _HEX_DIGITS
+        self._rgb_color_re = _RGB_COLOR_RE
+        self._named_colors = _NAMED_COLORS
+        self._simple_inline_regex = _SIMPLE_INLINE_RE
+        self.fast_path_max_length = _FAST_PATH_MAX_LENGTH
         
-        # URL validation pattern
-        self.safe_url_pattern = re.compile(r'^https?://[^\s<>"\']+$|^data:image/[^;]+;base64,[A-Za-z0-9+/=]+$')
+        # Memoized per instance so a customized allow-list never shares results
+        self._sanitize_css_cached = lru_cache(maxsize=_CACHE_SIZE)(self._sanitize_css_uncached)
+        self._parse_decls_cached = lru_cache(maxsize=_DECLS_CACHE_SIZE)(
+            self._parse_declarations_uncached
+        )
     
     def sanitize_css(self, css_content: str) -> str:
         """
@@ -74,16 +149,39 @@ class CSSSanitizer:
         if not css_content or not isinstance(css_content, str):
             return ""
         
+        # Whitespace, bare ';' and anything else without a declaration
+        # (every declaration has a colon) sanitizes to nothing
+        if ':' not in css_content:
+            return ""
+        
+        # Control characters, BOM and C1 are ident characters to the
+        # tokenizer ('\ufeffurl(' reads as a harmless function), so they
+        # go before any check rather than after the url() allowlist
+        cleaned = css_content.translate(self._ctrl_delete_table)
+        if cleaned != css_content:
+            logger.warning("Suspicious unicode characters in CSS stripped")
+            css_content = cleaned
+        
+        # Quick security scan, outside the cache so every blocked input is logged
+        if self._is_dangerous(css_content):
+            logger.warning("Dangerous CSS pattern detected and blocked")
+            return ""
+        
+        if len(css_content) > _CACHE_MAX_INPUT_LENGTH:
+            return self._sanitize_css_uncached(css_content)
+        return self._sanitize_css_cached(css_content)
+    
+    def _sanitize_css_uncached(self, css_content: str) -> str:
+        """Sanitize screened CSS content without consulting the result cache."""
         try:
-            # Quick security scan
-            if self.dangerous_regex.search(css_content):
-                logger.warning("Dangerous CSS pattern detected and blocked")
-                return ""
-            
             # Check if this looks like a full stylesheet or inline styles
             if '{' in css_content and '}' in css_content:
                 # This is a full stylesheet, parse as such
                 return self._sanitize_stylesheet(css_content)
+            elif (len(css_content) < self.fast_path_max_length
+                  and self._simple_inline_regex.fullmatch(css_content)):
+                # Common short style="" values skip the tokenizer
+                return self._sanitize_simple_inline_styles(css_content)
             else:
                 # This looks like inline styles, parse as declarations
                 return self._sanitize_inline_styles(css_content)
@@ -92,6 +190,14 @@ class CSSSanitizer:
             logger.warning(f"CSS parsing error: {str(e)}")
             return ""
     
+    def _is_dangerous(self, text: str) -> bool:
+        """Check text against the dangerous CSS patterns."""
+        lowered = text.lower()
+        for literal in self._dangerous_literals:
+            if literal in lowered:
+                return True
+        return self._dangerous_residual_regex.search(text) is not None
+    
     def _sanitize_stylesheet(self, css_content: str) -> str:
         """Sanitize a full CSS stylesheet."""
         try:
@@ -116,24 +222,29 @@ class CSSSanitizer:
     def _sanitize_inline_styles(self, css_content: str) -> str:
         """Sanitize inline CSS declarations."""
         try:
-            # Parse CSS using tinycss2
-            parsed = tinycss2.parse_declaration_list(css_content)
-            
-            sanitized_declarations = []
-            
-            for token in parsed:
-                if isinstance(token, Declaration):
-                    if self._is_safe_declaration(token):
-                        sanitized_value = self._sanitize_value(token.value)
-                        if sanitized_value:
-                            sanitized_declarations.append(f"{token.name}: {sanitized_value}")
-                
-            return "; ".join(sanitized_declarations)
+            declarations = self._parse_declarations(css_content)
+            return "; ".join(f"{name}: {value}" for name, value in declarations)
             
         except Exception as e:
             logger.warning(f"Declaration parsing error: {str(e)}")
             return ""
     
+    def _sanitize_simple_inline_styles(self, css_content: str) -> str:
+        """Sanitize inline declarations that need no tokenization."""
+        sanitized_declarations = []
+        
+        for part in css_content.split(';'):
+            name, separator, value = part.partition(':')
+            name = name.strip()
+            if not separator or name.lower() not in self.allowed_properties:
+                continue
+            
+            sanitized_value = self._validate_property_specific(value)
+            if sanitized_value:
+                sanitized_declarations.append(f"{name}: {sanitized_value}")
+        
+        return "; ".join(sanitized_declarations)
+    
     def _serialize_selector(self, prelude) -> str:
         """Serialize a CSS selector from tokens."""
         return ''.join(token.serialize() for token in prelude).strip()
@@ -141,33 +252,14 @@ class CSSSanitizer:
     def _is_safe_selector(self, selector: str) -> bool:
         """Check if a CSS selector is safe."""
         # Basic selector safety - block dangerous patterns
-        dangerous_selector_patterns = [
-            r'javascript\s*:',
-            r'expression\s*\(',
-            r'@import',
-            r'url\s*\(\s*["\']?\s*javascript'
-        ]
-        
-        for pattern in dangerous_selector_patterns:
-            if re.search(pattern, selector, re.IGNORECASE):
-                return False
-        
-        return True
+        return not self._dangerous_selector_regex.search(selector)
     
     def _sanitize_declarations(self, content) -> str:
         """Sanitize declarations within a CSS rule."""
         try:
-            parsed_declarations = tinycss2.parse_declaration_list(content)
-            sanitized_declarations = []
-            
-            for token in parsed_declarations:
-                if isinstance(token, Declaration):
-                    if self._is_safe_declaration(token):
-                        sanitized_value = self._sanitize_value(token.value)
-                        if sanitized_value:
-                            sanitized_declarations.append(f"{token.name}: {sanitized_value}")
-            
-            return "; ".join(sanitized_declarations)
+            # tinycss2 parses the rule's component values directly
+            declarations = self._sanitize_declaration_list(content)
+            return "; ".join(f"{name}: {value}" for name, value in declarations)
             
         except Exception as e:
             logger.warning(f"Declaration sanitization error: {str(e)}")
@@ -185,9 +277,33 @@ class CSSSanitizer:
         """
         return self.sanitize_css(style_value)
     
+    def _parse_declarations(self, text: str) -> tuple:
+        """Parse and sanitize a declaration list, reusing cached results."""
+        if len(text) > _CACHE_MAX_INPUT_LENGTH:
+            return self._parse_declarations_uncached(text)
+        return self._parse_decls_cached(text)
+    
+    def _parse_declarations_uncached(self, text: str) -> tuple:
+        """Parse a declaration list into sanitized (name, value) pairs."""
+        return self._sanitize_declaration_list(text)
+    
+    def _sanitize_declaration_list(self, declaration_input) -> tuple:
+        """Sanitize a declaration list given as text or rule component values."""
+        declarations = []
+        
+        for token in tinycss2.parse_declaration_list(declaration_input):
+            if isinstance(token, Declaration):
+                if self._is_safe_declaration(token):
+                    sanitized_value = self._sanitize_value(token.value)
+                    if sanitized_value:
+                        declarations.append((token.name, sanitized_value))
+        
+        return tuple(declarations)
+    
     def _is_safe_declaration(self, declaration: Declaration) -> bool:
         """Check if a CSS declaration is safe to include."""
-        property_name = declaration.name.lower().strip()
+        # tinycss2 already lowercases the name; identifiers hold no whitespace
+        property_name = declaration.lower_name
         
         # Check against whitelist
         if property_name not in self.allowed_properties:
@@ -199,37 +315,67 @@ class CSSSanitizer:
     def _sanitize_value(self, value_tokens) -> str:
         """Sanitize CSS property values."""
         try:
-            # Convert tokens back to string
-            value_string = tinycss2.serialize(value_tokens).strip()
+            # Walk the tokens directly, dropping unsafe URLs as we go
+            value_string = self._serialize_value_tokens(value_tokens).strip()
             
             # Remove dangerous patterns
-            if self.dangerous_regex.search(value_string):
+            if self._is_dangerous(value_string):
                 logger.warning(f"Dangerous CSS value blocked: {value_string}")
                 return ""
             
-            # Validate URLs in values
-            url_pattern = re.compile(r'url\s*\(\s*["\']?([^)]+?)["\']?\s*\)', re.IGNORECASE)
-            
-            def validate_url(match):
-                url = match.group(1).strip().strip('"\'')
-                if self.safe_url_pattern.match(url):
-                    return match.group(0)  # Keep original if safe
-                else:
-                    logger.warning(f"Unsafe URL in CSS blocked: {url}")
-                    return ""
-            
-            # Replace URLs with validated versions
-            sanitized_value = url_pattern.sub(validate_url, value_string)
-            
             # Additional validation for specific properties
-            sanitized_value = self._validate_property_specific(sanitized_value)
-            
-            return sanitized_value
+            return self._validate_property_specific(value_string)
             
         except Exception as e:
             logger.warning(f"CSS value sanitization error: {str(e)}")
             return ""
     
+    def _serialize_value_tokens(self, tokens) -> str:
+        """Serialize value tokens, omitting url() references that are not safe."""
+        parts = []
+        
+        for token in tokens:
+            token_type = token.type
+            
+            if token_type == 'url':
+                # Unquoted url(...) is tokenized as a single token
+                if self._is_safe_url(token.value):
+                    parts.append(token.serialize())
+            
+            elif token_type == 'function':
+                if token.lower_name == 'url':
+                    # Quoted url("...") is a function with one string argument
+                    arguments = [t for t in token.arguments if t.type != 'whitespace']
+                    if (len(arguments) == 1 and arguments[0].type == 'string'
+                            and self._is_safe_url(arguments[0].value)):
+                        parts.append(token.serialize())
+                    elif not (len(arguments) == 1 and arguments[0].type == 'string'):
+                        logger.warning("Unsupported url() arguments in CSS blocked")
+                else:
+                    parts.append(serialize_identifier(token.name))
+                    parts.append('(')
+                    parts.append(self._serialize_value_tokens(token.arguments))
+                    parts.append(')')
+            
+            elif token_type in _BLOCK_DELIMITERS:
+                opening, closing = _BLOCK_DELIMITERS[token_type]
+                parts.append(opening)
+                parts.append(self._serialize_value_tokens(token.content))
+                parts.append(closing)
+            
+            else:
+                parts.append(token.serialize())
+        
+        return ''.join(parts)
+    
+    def _is_safe_url(self, url: str) -> bool:
+        """Check a url() target against the safe URL pattern."""
+        url = url.strip()
+        if self.safe_url_pattern.match(url):
+            return True
+        logger.warning(f"Unsafe URL in CSS blocked: {url}")
+        return False
+    
     def _validate_property_specific(self, value: str) -> str:
         """Apply property-specific validation rules."""
         value = value.strip()
@@ -240,9 +386,10 @@ class CSSSanitizer:
             return value[:200]
         
         # Block unusual unicode characters that could be used for attacks
-        if re.search(r'[\u0000-\u001f\u007f-\u009f\ufeff]', value):
+        cleaned = value.translate(self._ctrl_delete_table)
+        if cleaned != value:
             logger.warning("Suspicious unicode characters in CSS value")
-            return re.sub(r'[\u0000-\u001f\u007f-\u009f\ufeff]', '', value)
+            return cleaned
         
         return value
     
@@ -253,32 +400,32 @@ class CSSSanitizer:
         
         color = color.strip().lower()
         
-        # Hex colors
-        if re.match(r'^#[0-9a-f]{3}$|^#[0-9a-f]{6}$', color):
+        # Named colors
+        if color in self._named_colors:
             return True
         
-        # RGB/RGBA colors
-        if re.match(r'^rgba?\s*\(\s*\d+\s*,\s*\d+\s*,\s*\d+\s*(?:,\s*[0-9.]+)?\s*\)$', color):
-            return True
-        
-        # Named colors (basic set)
-        named_colors = {
-            'white', 'black', 'red', 'green', 'blue', 'yellow', 'orange', 'purple',
-            'pink', 'brown', 'gray', 'grey', 'transparent', 'inherit', 'initial'
-        }
+        # Hex colors
+        if color.startswith('#'):
+            digits = color[1:]
+            return len(digits) in (3, 6) and all(c in self._hex_digits for c in digits)
         
-        if color in named_colors:
-            return True
+        # RGB/RGBA colors
+        if color.startswith('rgb'):
+            return self._rgb_color_re.match(color) is not None
         
         return False
 
 
+# Global instance for convenience
+_css_sanitizer = CSSSanitizer()
+
+
 # Bleach CSS sanitizer integration
 class BleachCSSSanitizer:
     """CSS sanitizer class for use with bleach."""
     
     def __init__(self):
-        self.sanitizer = CSSSanitizer()
+        self.sanitizer = _css_sanitizer
     
     def sanitize_css(self, style: str) -> str:
         """CSS sanitizer method for use with bleach."""
@@ -287,9 +434,6 @@ class BleachCSSSanitizer:
 # Create instance for use with bleach
 bleach_css_sanitizer = BleachCSSSanitizer()
 
-# Global instance for convenience
-_css_sanitizer = CSSSanitizer()
-
 def sanitize_css(css_content: str) -> str:
     """
     Standalone function to sanitize CSS content.
@@ -1,10 +1,17 @@
 """Enhanced logging system with structured logging and correlation IDs."""
 
+import asyncio
+import atexit
+import functools
 import logging
+import logging.handlers
 import json
+import queue
+import re
+import secrets
+import threading
 import time
-import uuid
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 import streamlit as st
 
@@ -14,29 +21,109 @@ try:
 except ImportError:
     STRUCTLOG_AVAILABLE = False
 
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:
+    get_script_run_ctx = None
+
+
+# Log records are handed to background listener threads so callers never
+# block on file or console writes; each distinct handler set gets its own
+# queue and listener.
+_log_listeners: Dict[tuple, Tuple[queue.Queue, logging.handlers.QueueListener]] = {}
+_log_listener_lock = threading.Lock()
+
+
+def _handler_key(handler: logging.Handler) -> tuple:
+    """Identify a handler by its destination, level and format."""
+    # File handlers opened with delay=True have no stream yet
+    destination = getattr(handler, 'baseFilename', None) or getattr(handler, 'stream', None)
+    formatter = handler.formatter
+    return (type(handler), destination, handler.level, formatter._fmt if formatter else None)
+
+
+@atexit.register
+def _stop_log_listeners() -> None:
+    """Flush and stop every listener thread at interpreter exit."""
+    with _log_listener_lock:
+        listeners = [listener for _, listener in _log_listeners.values()]
+        _log_listeners.clear()
+    for listener in listeners:
+        listener.stop()
+
+
+def _get_queue_handler(*handlers: logging.Handler) -> logging.handlers.QueueHandler:
+    """Return a handler feeding the listener for this handler set, starting it once."""
+    key = tuple(_handler_key(handler) for handler in handlers)
+    
+    with _log_listener_lock:
+        entry = _log_listeners.get(key)
+        if entry is None:
+            log_queue: queue.Queue = queue.Queue(-1)
+            listener = logging.handlers.QueueListener(
+                log_queue, *handlers, respect_handler_level=True
+            )
+            listener.start()
+            entry = _log_listeners[key] = (log_queue, listener)
+    
+    return logging.handlers.QueueHandler(entry[0])
+
+
+# structlog and the root handlers are process-wide, so they are set up once
+_structlog_configured = False
+_structlog_setup_lock = threading.Lock()
+
+
+# Per-thread correlation ID and whether the thread runs a Streamlit script
+_correlation_local = threading.local()
+
 
 class CorrelationIDProcessor:
     """Add correlation IDs to log entries."""
     
     def __call__(self, logger, method_name, event_dict):
-        # Get correlation ID from Streamlit session state or create new one
-        if hasattr(st, 'session_state') and 'correlation_id' in st.session_state:
-            correlation_id = st.session_state.correlation_id
-        else:
-            correlation_id = str(uuid.uuid4())[:8]
-            if hasattr(st, 'session_state'):
+        correlation_id = getattr(_correlation_local, 'correlation_id', None)
+        if correlation_id is None:
+            correlation_id = secrets.token_hex(4)
+            _correlation_local.correlation_id = correlation_id
+            _correlation_local.has_streamlit = self._has_script_context()
+        
+        # Share the ID with the Streamlit session so reruns keep it
+        if _correlation_local.has_streamlit:
+            if 'correlation_id' in st.session_state:
+                correlation_id = st.session_state.correlation_id
+            else:
                 st.session_state.correlation_id = correlation_id
         
         event_dict['correlation_id'] = correlation_id
         return event_dict
+    
+    @staticmethod
+    def _has_script_context() -> bool:
+        """Check whether the current thread is running a Streamlit script."""
+        if get_script_run_ctx is None:
+            return hasattr(st, 'session_state')
+        return get_script_run_ctx(suppress_warning=True) is not None
 
 
 class TimestampProcessor:
     """Add high-precision timestamps to log entries."""
     
+    def __init__(self):
+        # (whole second, formatted date/time prefix) of the last record
+        self._prefix_cache = (None, '')
+    
     def __call__(self, logger, method_name, event_dict):
-        event_dict['timestamp'] = time.time()
-        event_dict['iso_timestamp'] = time.strftime('%Y-%m-%dT%H:%M:%S.%fZ', time.gmtime())
+        now = time.time()
+        seconds = int(now)
+        
+        cached_seconds, prefix = self._prefix_cache
+        if seconds != cached_seconds:
+            prefix = time.strftime('%Y-%m-%dT%H:%M:%S.', time.gmtime(seconds))
+            self._prefix_cache = (seconds, prefix)
+        
+        event_dict['timestamp'] = now
+        event_dict['iso_timestamp'] = f"{prefix}{int((now - seconds) * 1_000_000):06d}Z"
         return event_dict
 
 
@@ -48,10 +135,13 @@ class SecurityEventProcessor:
         'blocked', 'sanitized', 'validation', 'unauthorized'
     ]
     
+    # All keywords in one pass over the event text
+    _keyword_regex = re.compile('|'.join(map(re.escape, SECURITY_KEYWORDS)), re.IGNORECASE)
+    
     def __call__(self, logger, method_name, event_dict):
-        event_text = str(event_dict.get('event', '')).lower()
+        event_text = str(event_dict.get('event', ''))
         
-        if any(keyword in event_text for keyword in self.SECURITY_KEYWORDS):
+        if self._keyword_regex.search(event_text):
             event_dict['security_event'] = True
             event_dict['alert_level'] = 'high' if method_name in ['error', 'critical'] else 'medium'
         
@@ -73,9 +163,25 @@ class PerformanceProcessor:
         return event_dict
 
 
+class LazyContext:
+    """Log context that is only formatted when a handler emits the record."""
+    
+    __slots__ = ('context',)
+    
+    def __init__(self, context: Dict[str, Any]):
+        self.context = context
+    
+    def __str__(self) -> str:
+        if not self.context:
+            return ""
+        return f"[{', '.join(f'{k}={v}' for k, v in self.context.items())}]"
+
+
 class EnhancedLogger:
     """Enhanced logger with structured logging and security features."""
     
+    __slots__ = ('name', 'log_file', 'logger', '_stdlib_logger')
+    
     def __init__(self, name: str, log_file: Optional[str] = None):
         """Initialize enhanced logger."""
         self.name = name
@@ -88,6 +194,17 @@ class EnhancedLogger:
     
     def _setup_structlog(self):
         """Setup structured logging with processors."""
+        global _structlog_configured
+        
+        # Create logger; levels are checked on the stdlib logger behind it
+        self.logger = structlog.get_logger(self.name)
+        self._stdlib_logger = logging.getLogger(self.name)
+        
+        with _structlog_setup_lock:
+            if _structlog_configured:
+                return
+            _structlog_configured = True
+        
         # Configure structlog
         structlog.configure(
             processors=[
@@ -111,31 +228,34 @@ class EnhancedLogger:
             cache_logger_on_first_use=True,
         )
         
-        # Create logger
-        self.logger = structlog.get_logger(self.name)
-        
         # Setup file handler for structured logs
-        file_handler = logging.FileHandler(self.log_file)
+        file_handler = logging.FileHandler(self.log_file, delay=True)
         file_handler.setLevel(logging.INFO)
         
         # Setup console handler
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.WARNING)
         
-        # Configure root logger
+        # structlog handles formatting
+        formatter = logging.Formatter('%(message)s')
+        file_handler.setFormatter(formatter)
+        console_handler.setFormatter(formatter)
+        
+        # Configure root logger; writes happen on the listener thread
         logging.basicConfig(
             level=logging.INFO,
-            handlers=[file_handler, console_handler],
-            format='%(message)s'  # structlog handles formatting
+            handlers=[_get_queue_handler(file_handler, console_handler)],
+            format='%(message)s'
         )
     
     def _setup_standard_logging(self):
         """Setup standard logging as fallback."""
         self.logger = logging.getLogger(self.name)
         self.logger.setLevel(logging.INFO)
+        self._stdlib_logger = self.logger
         
-        # File handler
-        file_handler = logging.FileHandler(self.log_file)
+        # File handler (opened lazily by the listener thread)
+        file_handler = logging.FileHandler(self.log_file, delay=True)
         file_handler.setLevel(logging.INFO)
         
         # Console handler
@@ -150,32 +270,34 @@ class EnhancedLogger:
         console_handler.setFormatter(formatter)
         
         if not self.logger.handlers:
-            self.logger.addHandler(file_handler)
-            self.logger.addHandler(console_handler)
+            self.logger.addHandler(_get_queue_handler(file_handler, console_handler))
     
     def info(self, message: str, **kwargs):
         """Log info message with context."""
+        if not self._stdlib_logger.isEnabledFor(logging.INFO):
+            return
         if STRUCTLOG_AVAILABLE:
             self.logger.info(message, **kwargs)
         else:
-            context = self._format_context(kwargs)
-            self.logger.info(f"{message} {context}")
+            self.logger.info("%s %s", message, LazyContext(kwargs))
     
     def warning(self, message: str, **kwargs):
         """Log warning message with context."""
+        if not self._stdlib_logger.isEnabledFor(logging.WARNING):
+            return
         if STRUCTLOG_AVAILABLE:
             self.logger.warning(message, **kwargs)
         else:
-            context = self._format_context(kwargs)
-            self.logger.warning(f"{message} {context}")
+            self.logger.warning("%s %s", message, LazyContext(kwargs))
     
     def error(self, message: str, **kwargs):
         """Log error message with context."""
+        if not self._stdlib_logger.isEnabledFor(logging.ERROR):
+            return
         if STRUCTLOG_AVAILABLE:
             self.logger.error(message, **kwargs)
         else:
-            context = self._format_context(kwargs)
-            self.logger.error(f"{message} {context}")
+            self.logger.error("%s %s", message, LazyContext(kwargs))
     
     def security_event(self, message: str, event_type: str, **kwargs):
         """Log security event with special marking."""
@@ -221,9 +343,7 @@ class EnhancedLogger:
     
     def _format_context(self, context: Dict[str, Any]) -> str:
         """Format context for standard logging."""
-        if not context:
-            return ""
-        return f"[{', '.join(f'{k}={v}' for k, v in context.items())}]"
+        return str(LazyContext(context))
 
 
 class ApplicationMetrics:
@@ -237,43 +357,59 @@ class ApplicationMetrics:
             'files_processed': 0,
             'cache_hits': 0,
             'cache_misses': 0,
-            'processing_times': [],
-            'file_sizes': [],
+            'processing_time_sum': 0.0,
+            'processing_time_count': 0,
+            'file_size_sum': 0,
+            'file_size_count': 0,
             'security_events': 0
         }
         
         self.start_time = time.time()
+        self._lock = threading.Lock()
     
     def increment_requests(self):
         """Increment total requests."""
-        self.metrics['requests_total'] += 1
+        with self._lock:
+            self.metrics['requests_total'] += 1
     
     def increment_errors(self):
         """Increment error count."""
-        self.metrics['errors_total'] += 1
+        with self._lock:
+            self.metrics['errors_total'] += 1
     
     def record_file_processing(self, file_size: int, processing_time: float):
         """Record file processing metrics."""
-        self.metrics['files_processed'] += 1
-        self.metrics['file_sizes'].append(file_size)
-        self.metrics['processing_times'].append(processing_time)
+        with self._lock:
+            self.metrics['files_processed'] += 1
+            self.metrics['file_size_sum'] += file_size
+            self.metrics['file_size_count'] += 1
+            self.metrics['processing_time_sum'] += processing_time
+            self.metrics['processing_time_count'] += 1
     
     def record_cache_hit(self):
         """Record cache hit."""
-        self.metrics['cache_hits'] += 1
+        with self._lock:
+            self.metrics['cache_hits'] += 1
     
     def record_cache_miss(self):
         """Record cache miss."""
-        self.metrics['cache_misses'] += 1
+        with self._lock:
+            self.metrics['cache_misses'] += 1
     
     def record_security_event(self):
         """Record security event."""
-        self.metrics['security_events'] += 1
+        with self._lock:
+            self.metrics['security_events'] += 1
     
     def get_summary(self) -> Dict[str, Any]:
         """Get metrics summary."""
         uptime = time.time() - self.start_time
         
+        with self._lock:
+            return self._build_summary(uptime)
+    
+    def _build_summary(self, uptime: float) -> Dict[str, Any]:
+        """Build the summary dict; caller holds the lock."""
         return {
             'uptime_seconds': round(uptime, 2),
             'requests_total': self.metrics['requests_total'],
@@ -283,10 +419,11 @@ class ApplicationMetrics:
             ),
             'files_processed': self.metrics['files_processed'],
             'avg_processing_time': round(
-                sum(self.metrics['processing_times']) / max(len(self.metrics['processing_times']), 1), 2
+                self.metrics['processing_time_sum']
+                / max(self.metrics['processing_time_count'], 1), 2
             ),
             'avg_file_size': round(
-                sum(self.metrics['file_sizes']) / max(len(self.metrics['file_sizes']), 1), 2
+                self.metrics['file_size_sum'] / max(self.metrics['file_size_count'], 1), 2
             ),
             'cache_hit_rate': round(
                 (self.metrics['cache_hits'] / max(self.metrics['cache_hits'] + self.metrics['cache_misses'], 1)) * 100, 2
@@ -296,7 +433,7 @@ class ApplicationMetrics:
 
 
 # Global instances
-@st.cache_resource
+@functools.lru_cache(maxsize=None)
 def get_enhanced_logger(name: str) -> EnhancedLogger:
     """Get enhanced logger instance."""
     return EnhancedLogger(name)
@@ -312,36 +449,61 @@ def get_application_metrics() -> ApplicationMetrics:
 def log_performance(operation_name: str):
     """Decorator to log performance metrics."""
     def decorator(func):
-        def wrapper(*args, **kwargs):
-            logger = get_enhanced_logger(func.__module__)
-            metrics = get_application_metrics()
+        # Resolved on first call, then reused for every later call
+        resolved = None
+        
+        def resolve():
+            nonlocal resolved
+            if resolved is None:
+                resolved = (get_enhanced_logger(func.__module__), get_application_metrics())
+            return resolved
+        
+        def log_success(duration: float):
+            logger, _ = resolved or resolve()
+            logger.performance_event(
+                f"Operation completed: {operation_name}",
+                duration=duration,
+                operation=operation_name,
+                function=func.__name__
+            )
+        
+        def log_failure(duration: float, error: Exception):
+            logger, metrics = resolved or resolve()
+            metrics.increment_errors()
+            
+            logger.error(
+                f"Operation failed: {operation_name}",
+                duration=duration,
+                operation=operation_name,
+                function=func.__name__,
+                error=str(error)
+            )
+        
+        # Pick the wrapper once instead of branching on every call
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start_time = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                    log_success(time.perf_counter() - start_time)
+                    return result
+                except Exception as e:
+                    log_failure(time.perf_counter() - start_time, e)
+                    raise
             
-            start_time = time.time()
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
-                duration = time.time() - start_time
-                
-                logger.performance_event(
-                    f"Operation completed: {operation_name}",
-                    duration=duration,
-                    operation=operation_name,
-                    function=func.__name__
-                )
-                
+                log_success(time.perf_counter() - start_time)
                 return result
-                
             except Exception as e:
-                duration = time.time() - start_time
-                metrics.increment_errors()
-                
-                logger.error(
-                    f"Operation failed: {operation_name}",
-                    duration=duration,
-                    operation=operation_name,
-                    function=func.__name__,
-                    error=str(e)
-                )
+                log_failure(time.perf_counter() - start_time, e)
                 raise
         
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
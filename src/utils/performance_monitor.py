@@ -1,6 +1,8 @@
 """Performance monitoring and metrics collection system."""
 
+import math
 import time
+import numpy as np
 import psutil
 import threading
 from typing import Dict, List, Any, Optional
@@ -15,71 +17,271 @@ except ImportError:
     PROMETHEUS_AVAILABLE = False
 
 
+# File size categories, indexed by PerformanceMetric.size_category
+SIZE_CATEGORIES = ('small', 'medium', 'large')
+
+# Load average is not available on every platform
+_HAS_LOADAVG = hasattr(psutil, 'getloadavg')
+
+
 @dataclass
 class PerformanceMetric:
     """Individual performance metric."""
     name: str
     value: float
-    timestamp: float
+    timestamp: int  # time.monotonic_ns()
     labels: Dict[str, str] = field(default_factory=dict)
+    size_category: int = -1  # index into SIZE_CATEGORIES, -1 if not a file metric
 
 
 class PerformanceBuffer:
-    """Circular buffer for performance metrics."""
+    """Circular buffer for performance metrics.
+    
+    Metrics are stored column-wise (names, values, timestamps) in
+    preallocated arrays so summaries are vectorized scans. A short lock
+    covers each row write with its publish, and readers copy the rows they
+    need under it, so no reader sees a half-written or overwritten row.
+    """
     
     def __init__(self, max_size: int = 1000):
         """Initialize performance buffer."""
         self.max_size = max_size
-        self.buffer = deque(maxlen=max_size)
-        self.lock = threading.Lock()
+        
+        # Power-of-two capacity so the slot index is a mask, not a modulo
+        self.capacity = 1 << max(max_size - 1, 1).bit_length()
+        self._mask = self.capacity - 1
+        self._names = np.empty(self.capacity, dtype=object)
+        self._values = np.zeros(self.capacity, dtype=np.float64)
+        self._timestamps = np.zeros(self.capacity, dtype=np.int64)
+        self._size_categories = np.full(self.capacity, -1, dtype=np.int8)
+        self._labels: Dict[int, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._published = 0
     
     def add_metric(self, metric: PerformanceMetric):
         """Add metric to buffer."""
-        with self.lock:
-            self.buffer.append(metric)
+        with self._lock:
+            slot = self._published & self._mask
+            self._names[slot] = metric.name
+            self._values[slot] = metric.value
+            self._timestamps[slot] = metric.timestamp
+            self._size_categories[slot] = metric.size_category
+            
+            # Labels are rare, so they live in a sparse side table
+            if metric.labels:
+                self._labels[slot] = metric.labels
+            else:
+                self._labels.pop(slot, None)
+            
+            self._published += 1
+    
+    def _recent_slots(self) -> np.ndarray:
+        """Slot indices of up to ``max_size`` most recent metrics, oldest first (lock held)."""
+        end = self._published
+        count = min(end, self.max_size)
+        return np.arange(end - count, end) & self._mask
+    
+    def _recent_columns(self, *columns: np.ndarray) -> List[np.ndarray]:
+        """Copies of the recent rows of ``columns``, taken under the lock."""
+        with self._lock:
+            end = self._published
+            count = min(end, self.max_size)
+            start = (end - count) & self._mask
+            if start + count <= self.capacity:
+                return [column[start:start + count].copy() for column in columns]
+            slots = self._recent_slots()
+            return [column[slots] for column in columns]
     
     def get_metrics(self, metric_name: Optional[str] = None, last_n: Optional[int] = None) -> List[PerformanceMetric]:
         """Get metrics from buffer."""
-        with self.lock:
-            metrics = list(self.buffer)
-        
-        if metric_name:
-            metrics = [m for m in metrics if m.name == metric_name]
-        
-        if last_n:
-            metrics = metrics[-last_n:]
+        with self._lock:
+            slots = self._recent_slots()
+            
+            if metric_name:
+                slots = slots[self._names[slots] == metric_name]
+            
+            if last_n:
+                slots = slots[-last_n:]
+            
+            rows = list(zip(
+                self._names[slots].tolist(), self._values[slots].tolist(),
+                self._timestamps[slots].tolist(), self._size_categories[slots].tolist(),
+                [dict(self._labels.get(slot, {})) for slot in slots.tolist()]
+            ))
         
-        return metrics
+        return [
+            PerformanceMetric(
+                name=name,
+                value=value,
+                timestamp=timestamp,
+                labels=labels,
+                size_category=size_category
+            )
+            for name, value, timestamp, size_category, labels in rows
+        ]
     
-    def get_summary(self, metric_name: str, time_window: float = 300) -> Dict[str, float]:
+    def get_summary(self, metric_name: Optional[str], time_window: float = 300) -> Dict[str, float]:
         """Get statistical summary of metrics."""
-        current_time = time.time()
-        cutoff_time = current_time - time_window
+        cutoff_time = time.monotonic_ns() - int(time_window * 1e9)
         
-        with self.lock:
-            recent_metrics = [
-                m.value for m in self.buffer 
-                if m.name == metric_name and m.timestamp >= cutoff_time
-            ]
+        names, values, timestamps = self._recent_columns(
+            self._names, self._values, self._timestamps
+        )
+        mask = timestamps >= cutoff_time
+        if metric_name:
+            mask &= names == metric_name
+        recent_metrics = values[mask]
         
-        if not recent_metrics:
+        if not recent_metrics.size:
             return {}
         
+        # One O(n) partition places all three percentile ranks at once
+        count = recent_metrics.size
+        ranks = [min(int(p * count), count - 1) for p in (0.50, 0.95, 0.99)]
+        partitioned = np.partition(recent_metrics, ranks)
+        
         return {
-            'count': len(recent_metrics),
-            'min': min(recent_metrics),
-            'max': max(recent_metrics),
-            'avg': sum(recent_metrics) / len(recent_metrics),
-            'p50': self._percentile(recent_metrics, 50),
-            'p95': self._percentile(recent_metrics, 95),
-            'p99': self._percentile(recent_metrics, 99)
+            'count': int(count),
+            'min': float(recent_metrics.min()),
+            'max': float(recent_metrics.max()),
+            'avg': float(recent_metrics.mean()),
+            'p50': float(partitioned[ranks[0]]),
+            'p95': float(partitioned[ranks[1]]),
+            'p99': float(partitioned[ranks[2]])
         }
+
+
+class LatencyHistogram:
+    """Fixed-size log-bucketed histogram of durations.
+    
+    Buckets grow geometrically by ``bucket_ratio`` from 1 microsecond up to
+    ``max_seconds``, so memory is constant and any percentile is within
+    ``bucket_ratio - 1`` (1%) of the true value. Recording is a lock-free
+    deque append; pending samples are folded into the buckets in one
+    vectorized pass when the histogram is read or the backlog reaches
+    ``drain_threshold``.
+    """
+    
+    bucket_ratio = 1.01
+    max_seconds = 60.0
+    drain_threshold = 4096
+    
+    def __init__(self):
+        """Initialize empty histogram."""
+        self._log_ratio = math.log(self.bucket_ratio)
+        bucket_count = int(math.log(self.max_seconds * 1e6) / self._log_ratio) + 1
+        self.counts = np.zeros(bucket_count, dtype=np.int64)
+        self._pending = deque()
+        self._drain_lock = threading.Lock()
+        self._count = 0
+        self._total = 0.0
+        self._min = math.inf
+        self._max = 0.0
+        
+        # Running mean and sum of squared deviations, merged per batch
+        self._mean = 0.0
+        self._m2 = 0.0
     
-    def _percentile(self, data: List[float], percentile: int) -> float:
-        """Calculate percentile."""
-        sorted_data = sorted(data)
-        index = int((percentile / 100) * len(sorted_data))
-        return sorted_data[min(index, len(sorted_data) - 1)]
+    def record(self, duration: float):
+        """Record one duration in seconds."""
+        # deque.append is atomic, so concurrent writers never wait on each other
+        self._pending.append(duration)
+        
+        if len(self._pending) >= self.drain_threshold and self._drain_lock.acquire(blocking=False):
+            try:
+                self._drain()
+            finally:
+                self._drain_lock.release()
+    
+    def _sync(self):
+        """Fold every pending sample into the aggregates."""
+        if self._pending:
+            with self._drain_lock:
+                self._drain()
+    
+    def _drain(self):
+        """Merge pending samples into the aggregates; caller holds the lock."""
+        pending = self._pending
+        batch_size = len(pending)
+        if not batch_size:
+            return
+        
+        # popleft is atomic, so samples appended meanwhile stay queued
+        samples = np.fromiter((pending.popleft() for _ in range(batch_size)),
+                              dtype=np.float64, count=batch_size)
+        
+        micros = np.maximum(samples * 1e6, 1.0)
+        buckets = np.minimum(
+            (np.log(micros) / self._log_ratio).astype(np.int64), len(self.counts) - 1
+        )
+        self.counts += np.bincount(buckets, minlength=len(self.counts))
+        
+        # Chan et al. pairwise merge of the batch mean and M2
+        batch_mean = float(samples.mean())
+        batch_m2 = float(((samples - batch_mean) ** 2).sum())
+        count = self._count + batch_size
+        delta = batch_mean - self._mean
+        self._mean += delta * batch_size / count
+        self._m2 += batch_m2 + delta * delta * self._count * batch_size / count
+        self._count = count
+        
+        self._total += float(samples.sum())
+        self._min = min(self._min, float(samples.min()))
+        self._max = max(self._max, float(samples.max()))
+    
+    @property
+    def count(self) -> int:
+        """Number of recorded durations."""
+        self._sync()
+        return self._count
+    
+    @property
+    def total(self) -> float:
+        """Sum of recorded durations."""
+        self._sync()
+        return self._total
+    
+    @property
+    def mean(self) -> float:
+        """Mean of recorded durations."""
+        self._sync()
+        return self._mean
+    
+    @property
+    def min(self) -> float:
+        """Shortest recorded duration."""
+        self._sync()
+        return self._min
+    
+    @property
+    def max(self) -> float:
+        """Longest recorded duration."""
+        self._sync()
+        return self._max
+    
+    @property
+    def stddev(self) -> float:
+        """Sample standard deviation of recorded durations."""
+        self._sync()
+        if self._count < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self._count - 1))
+    
+    def percentiles(self, *percentiles: float) -> List[float]:
+        """Return the upper bucket bound (in seconds) for each percentile."""
+        self._sync()
+        if not self._count:
+            return [0.0] * len(percentiles)
+        
+        cumulative = np.cumsum(self.counts)
+        ranks = [max(math.ceil(p / 100 * self._count), 1) for p in percentiles]
+        buckets = np.searchsorted(cumulative, ranks)
+        
+        # Clamp to observed extremes so small samples report real values
+        return [
+            min(max(self.bucket_ratio ** (int(bucket) + 1) / 1e6, self._min), self._max)
+            for bucket in buckets
+        ]
 
 
 class SystemMetricsCollector:
@@ -89,29 +291,56 @@ class SystemMetricsCollector:
         """Initialize system metrics collector."""
         self.process = psutil.Process()
         self.start_time = time.time()
+        self.start_ns = time.monotonic_ns()
+        
+        # Readings are reused for cache_ttl seconds: key -> (taken_at, metrics)
+        self.cache_ttl = 1.0
+        self._cache: Dict[str, tuple] = {}
+    
+    def _cached(self, key: str, collect) -> Dict[str, float]:
+        """Return a recent reading for key, collecting a new one when stale."""
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry is None or now - entry[0] >= self.cache_ttl:
+            entry = (now, collect())
+            self._cache[key] = entry
+        return dict(entry[1])
     
     def get_memory_usage(self) -> Dict[str, float]:
         """Get memory usage metrics."""
+        return self._cached('memory', self._collect_memory_usage)
+    
+    def get_cpu_usage(self) -> Dict[str, float]:
+        """Get CPU usage metrics."""
+        return self._cached('cpu', self._collect_cpu_usage)
+    
+    def get_disk_usage(self) -> Dict[str, float]:
+        """Get disk usage metrics."""
+        return self._cached('disk', self._collect_disk_usage)
+    
+    def _collect_memory_usage(self) -> Dict[str, float]:
+        """Read memory usage from psutil."""
         memory_info = self.process.memory_info()
         system_memory = psutil.virtual_memory()
         
+        # Same figure memory_percent() reports, without re-reading memory_info
         return {
             'process_memory_mb': memory_info.rss / 1024 / 1024,
-            'process_memory_percent': self.process.memory_percent(),
+            'process_memory_percent': memory_info.rss / system_memory.total * 100,
             'system_memory_percent': system_memory.percent,
             'system_memory_available_mb': system_memory.available / 1024 / 1024
         }
     
-    def get_cpu_usage(self) -> Dict[str, float]:
-        """Get CPU usage metrics."""
+    def _collect_cpu_usage(self) -> Dict[str, float]:
+        """Read CPU usage from psutil."""
         return {
             'process_cpu_percent': self.process.cpu_percent(),
             'system_cpu_percent': psutil.cpu_percent(),
-            'load_average_1m': psutil.getloadavg()[0] if hasattr(psutil, 'getloadavg') else 0
+            'load_average_1m': psutil.getloadavg()[0] if _HAS_LOADAVG else 0
         }
     
-    def get_disk_usage(self) -> Dict[str, float]:
-        """Get disk usage metrics."""
+    def _collect_disk_usage(self) -> Dict[str, float]:
+        """Read disk usage from psutil."""
         disk_usage = psutil.disk_usage('.')
         
         return {
@@ -123,12 +352,22 @@ class SystemMetricsCollector:
     
     def get_uptime(self) -> float:
         """Get application uptime in seconds."""
-        return time.time() - self.start_time
+        return (time.monotonic_ns() - self.start_ns) / 1e9
 
 
 class PerformanceMonitor:
     """Comprehensive performance monitoring system."""
     
+    __slots__ = (
+        'buffer', 'system_collector',
+        'prom_request_counter', 'prom_error_counter', 'prom_processing_time',
+        'prom_memory_usage', 'prom_cpu_usage',
+        'request_counter', 'error_counter', '_counter_lock',
+        'operation_timings', 'counter_window', '_counter_samples',
+        '_snapshot', '_activity_seq', 'gauge_epsilon', 'max_idle_intervals', '_gauge_values',
+        'monitoring_active', 'monitoring_thread'
+    )
+    
     def __init__(self):
         """Initialize performance monitor."""
         self.buffer = PerformanceBuffer()
@@ -138,10 +377,28 @@ class PerformanceMonitor:
         if PROMETHEUS_AVAILABLE:
             self._setup_prometheus_metrics()
         
-        # Application-specific metrics
+        # Application-specific counters, incremented under _counter_lock
         self.request_counter = 0
         self.error_counter = 0
-        self.operation_timings = {}
+        self._counter_lock = threading.Lock()
+        self.operation_timings: Dict[str, LatencyHistogram] = {}
+        
+        # (timestamp, requests, errors) snapshots taken by the background
+        # thread, used to derive recent request/error counts
+        self.counter_window = 300.0
+        self._counter_samples = deque([(time.monotonic_ns(), 0, 0)])
+        
+        # System aggregates published by the background thread
+        self._snapshot: Optional[dict] = None
+        
+        # Bumped by every record_* call; the background thread only has to
+        # see it change, so a racing increment that is lost does not matter
+        self._activity_seq = 0
+        
+        # Last values pushed to Prometheus gauges, and idle-skip settings
+        self.gauge_epsilon = 0.01
+        self.max_idle_intervals = 10
+        self._gauge_values: Dict[str, float] = {}
         
         # Background monitoring
         self.monitoring_active = False
@@ -177,39 +434,30 @@ class PerformanceMonitor:
     
     def record_request(self):
         """Record a new request."""
-        self.request_counter += 1
+        with self._counter_lock:
+            self.request_counter += 1
+        self._activity_seq += 1
         
         if PROMETHEUS_AVAILABLE:
             self.prom_request_counter.inc()
-        
-        metric = PerformanceMetric(
-            name='requests',
-            value=1,
-            timestamp=time.time()
-        )
-        self.buffer.add_metric(metric)
     
     def record_error(self, error_type: str = 'unknown'):
         """Record an error."""
-        self.error_counter += 1
+        with self._counter_lock:
+            self.error_counter += 1
+        self._activity_seq += 1
         
         if PROMETHEUS_AVAILABLE:
             self.prom_error_counter.inc()
-        
-        metric = PerformanceMetric(
-            name='errors',
-            value=1,
-            timestamp=time.time(),
-            labels={'error_type': error_type}
-        )
-        self.buffer.add_metric(metric)
     
     def record_operation_time(self, operation: str, duration: float):
         """Record operation timing."""
-        if operation not in self.operation_timings:
-            self.operation_timings[operation] = []
+        histogram = self.operation_timings.get(operation)
+        if histogram is None:
+            histogram = self.operation_timings.setdefault(operation, LatencyHistogram())
         
-        self.operation_timings[operation].append(duration)
+        histogram.record(duration)
+        self._activity_seq += 1
         
         if PROMETHEUS_AVAILABLE:
             self.prom_processing_time.observe(duration)
@@ -217,7 +465,7 @@ class PerformanceMonitor:
         metric = PerformanceMetric(
             name='operation_time',
             value=duration,
-            timestamp=time.time(),
+            timestamp=time.monotonic_ns(),
             labels={'operation': operation}
         )
         self.buffer.add_metric(metric)
@@ -227,13 +475,12 @@ class PerformanceMonitor:
         metric = PerformanceMetric(
             name='file_processing',
             value=processing_time,
-            timestamp=time.time(),
-            labels={
-                'file_type': file_type,
-                'file_size_category': self._get_size_category(file_size)
-            }
+            timestamp=time.monotonic_ns(),
+            labels={'file_type': file_type},
+            size_category=self._get_size_category(file_size)
         )
         self.buffer.add_metric(metric)
+        self._activity_seq += 1
     
     def start_background_monitoring(self, interval: float = 30.0):
         """Start background system monitoring."""
@@ -256,17 +503,35 @@ class PerformanceMonitor:
     
     def _background_monitor(self, interval: float):
         """Background monitoring loop."""
+        last_seen_activity = None
+        idle_intervals = 0
+        
         while self.monitoring_active:
             try:
+                # Counter samples are cheap and keep recent counts accurate
+                self._sample_counters()
+                
+                # Skip collection while nothing is recorded, but still refresh
+                # every max_idle_intervals so idle processes keep reporting
+                activity = self._activity_seq
+                if activity == last_seen_activity and idle_intervals < self.max_idle_intervals:
+                    idle_intervals += 1
+                    time.sleep(interval)
+                    continue
+                
+                last_seen_activity = activity
+                idle_intervals = 0
+                
                 # Collect system metrics
                 memory_metrics = self.system_collector.get_memory_usage()
                 cpu_metrics = self.system_collector.get_cpu_usage()
+                now = time.monotonic_ns()
                 
                 # Record memory usage
                 memory_metric = PerformanceMetric(
                     name='memory_usage',
                     value=memory_metrics['process_memory_mb'],
-                    timestamp=time.time()
+                    timestamp=now
                 )
                 self.buffer.add_metric(memory_metric)
                 
@@ -274,14 +539,19 @@ class PerformanceMonitor:
                 cpu_metric = PerformanceMetric(
                     name='cpu_usage',
                     value=cpu_metrics['process_cpu_percent'],
-                    timestamp=time.time()
+                    timestamp=now
                 )
                 self.buffer.add_metric(cpu_metric)
                 
                 # Update Prometheus metrics
                 if PROMETHEUS_AVAILABLE:
-                    self.prom_memory_usage.set(memory_metrics['process_memory_mb'])
-                    self.prom_cpu_usage.set(cpu_metrics['process_cpu_percent'])
+                    self._set_gauge(
+                        'memory', self.prom_memory_usage, memory_metrics['process_memory_mb']
+                    )
+                    self._set_gauge('cpu', self.prom_cpu_usage, cpu_metrics['process_cpu_percent'])
+                
+                # Publish a fresh snapshot with a single reference swap
+                self._snapshot = self._build_snapshot()
                 
                 time.sleep(interval)
                 
@@ -290,53 +560,100 @@ class PerformanceMonitor:
                 print(f"Background monitoring error: {e}")
                 time.sleep(interval)
     
-    def get_performance_summary(self) -> dict:
-        """Get comprehensive performance summary."""
-        import time
-        system_data = self.system_collector.get_memory_usage() if hasattr(self, 'system_collector') else {}
-        cpu_data = self.system_collector.get_cpu_usage() if hasattr(self, 'system_collector') else {}
-        disk_data = self.system_collector.get_disk_usage() if hasattr(self, 'system_collector') else {}
+    def _set_gauge(self, key: str, gauge, value: float):
+        """Set a Prometheus gauge only when the value moved by more than gauge_epsilon."""
+        last_value = self._gauge_values.get(key)
+        if last_value is None or abs(value - last_value) > self.gauge_epsilon:
+            gauge.set(value)
+            self._gauge_values[key] = value
+    
+    def _sample_counters(self):
+        """Snapshot the request/error counters and drop samples outside the window."""
+        now = time.monotonic_ns()
+        samples = self._counter_samples
+        samples.append((now, self.request_counter, self.error_counter))
+        
+        # Keep one sample older than the window as the baseline
+        cutoff = now - int(self.counter_window * 1e9)
+        while len(samples) > 1 and samples[1][0] <= cutoff:
+            samples.popleft()
+    
+    def _recent_counts(self) -> tuple:
+        """Requests and errors recorded since the oldest sample in the window."""
+        _, base_requests, base_errors = self._counter_samples[0]
+        return self.request_counter - base_requests, self.error_counter - base_errors
+    
+    def _build_snapshot(self) -> dict:
+        """Collect system aggregates for the summary."""
+        system_data = self.system_collector.get_memory_usage()
+        cpu_data = self.system_collector.get_cpu_usage()
+        disk_data = self.system_collector.get_disk_usage()
         
         # Merge system data
         system_combined = {**system_data, **cpu_data, **disk_data}
         
+        # Add memory, cpu, and disk keys for test compatibility (as dictionaries)
+        if system_data:
+            system_combined['memory'] = system_data
+        if cpu_data:
+            system_combined['cpu'] = cpu_data
+        if disk_data:
+            system_combined['disk'] = disk_data
+        
+        return {'system': system_combined}
+    
+    def _operation_stats(self) -> dict:
+        """Aggregate each operation's histogram; cheap enough to build per summary."""
+        operations = {}
+        for op, histogram in list(self.operation_timings.items()):
+            p50, p95, p99 = histogram.percentiles(50, 95, 99)
+            operations[op] = {
+                'count': histogram.count,
+                'total_time': histogram.total,
+                'avg_time': histogram.mean,
+                'std_time': histogram.stddev,
+                'p50_time': p50,
+                'p95_time': p95,
+                'p99_time': p99,
+            }
+        
+        return operations
+    
+    def get_performance_summary(self) -> dict:
+        """Get comprehensive performance summary.
+        
+        System aggregates come from the snapshot the background thread
+        publishes each interval (built here when monitoring is not running or
+        has not published yet); operation stats and counters are live.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or not self.monitoring_active:
+            snapshot = self._snapshot = self._build_snapshot()
+        
         summary = {
             'timestamp': time.time(),
-            'uptime_seconds': time.time() - self.system_collector.start_time if hasattr(self, 'system_collector') else 0,
-            'operations': {},
+            'uptime_seconds': self.system_collector.get_uptime(),
+            'operations': self._operation_stats(),
             'application': {
-                'total_requests': getattr(self, 'request_counter', 0),
-                'total_errors': getattr(self, 'error_counter', 0),
+                'total_requests': self.request_counter,
+                'total_errors': self.error_counter,
                 'error_rate_percent': 0.0,
                 'recent_requests': 0,
                 'recent_errors': 0
             },
-            'system': system_combined,
+            'system': dict(snapshot['system']),
         }
         
+        recent_requests, recent_errors = self._recent_counts()
+        summary['application']['recent_requests'] = recent_requests
+        summary['application']['recent_errors'] = recent_errors
+        
         # Calculate error rate
         total_requests = summary['application']['total_requests']
         total_errors = summary['application']['total_errors']
         if total_requests > 0:
             summary['application']['error_rate_percent'] = (total_errors / total_requests) * 100
         
-        if hasattr(self, 'operation_timings'):
-            for op, times in self.operation_timings.items():
-                total_time = sum(times)
-                summary['operations'][op] = {
-                    'count': len(times),
-                    'total_time': total_time,
-                    'avg_time': total_time / len(times) if times else 0,
-                }
-        
-        # Add memory, cpu, and disk keys for test compatibility (as dictionaries)
-        if system_data:
-            summary['system']['memory'] = system_data
-        if cpu_data:
-            summary['system']['cpu'] = cpu_data
-        if disk_data:
-            summary['system']['disk'] = disk_data
-            
         return summary
     
     def get_prometheus_metrics(self) -> str:
@@ -346,14 +663,14 @@ class PerformanceMonitor:
         
         return generate_latest().decode('utf-8')
     
-    def _get_size_category(self, size_bytes: int) -> str:
-        """Categorize file size."""
-        if size_bytes < 1024 * 1024:  # < 1MB
-            return 'small'
-        elif size_bytes < 10 * 1024 * 1024:  # < 10MB
-            return 'medium'
+    def _get_size_category(self, size_bytes: int) -> int:
+        """Categorize file size as an index into SIZE_CATEGORIES."""
+        if size_bytes < 1 << 20:  # < 1MB
+            return 0
+        elif size_bytes < 10 << 20:  # < 10MB
+            return 1
         else:
-            return 'large'
+            return 2
 
 
 # Global performance monitor
@@ -373,14 +690,14 @@ def monitor_performance(operation_name: str):
             monitor = get_performance_monitor()
             monitor.record_request()
             
-            start_time = time.time()
+            start_time = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
                 monitor.record_operation_time(operation_name, duration)
                 return result
             except Exception as e:
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
                 monitor.record_operation_time(operation_name, duration)
                 monitor.record_error(type(e).__name__)
                 raise
@@ -1,43 +1,286 @@
 """HTML sanitization utilities for security."""
 
 import bleach
-from html_sanitizer import Sanitizer
+from bleach.html5lib_shim import Filter
+import functools
+import itertools
 import logging
+import re
 from typing import Dict, List, Optional
-from models.style_models import SecurityConfig
+from models.style_models import SecurityConfig, get_default_security_config
 from utils.css_sanitizer import bleach_css_sanitizer
 
+try:
+    import nh3
+    NH3_AVAILABLE = True
+except ImportError:
+    NH3_AVAILABLE = False
+
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
+def _compile_linear(pattern: str, flags: int = 0):
+    """Compile a pattern run over untrusted text, on RE2 when it is installed.
+    
+    RE2 matches in linear time, so lazy bodies such as ``alert(.*?)`` cannot
+    go quadratic on input with many unterminated starts; the backtracking
+    stdlib engine is the fallback.
+    """
+    if RE2_AVAILABLE:
+        inline_flags = ('i' if flags & re.IGNORECASE else '') + ('s' if flags & re.DOTALL else '')
+        try:
+            return re2.compile(f'(?{inline_flags}){pattern}' if inline_flags else pattern)
+        except Exception as e:
+            logger.warning(f"RE2 rejected pattern, using stdlib regex: {str(e)}")
+    return re.compile(pattern, flags)
+
+
+# Leftover <script> blocks and common JS attack patterns removed after sanitizing
+_SCRIPT_BLOCK_PATTERN = r'<script.*?>.*?</script>'
+_SCRIPT_BLOCK_RE = _compile_linear(_SCRIPT_BLOCK_PATTERN, re.IGNORECASE | re.DOTALL)
+_DANGEROUS_JS_PATTERNS = (
+    r'alert\s*\(.*?\)', r'fetch\s*\(.*?\)', r'onclick\s*=\s*".*?"', r'onerror\s*=\s*".*?"',
+    r'javascript:', r'<iframe.*?>.*?</iframe>', r'XSS', r'maliciousFunction', r'stealData',
+    r'document\.cookie'
+)
+_DANGEROUS_JS_RE = _compile_linear(
+    '|'.join(f'(?:{pattern})' for pattern in _DANGEROUS_JS_PATTERNS),
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def _build_cleanup_database():
+    """Compile the cleanup patterns into one Hyperscan database, if available."""
+    if not HYPERSCAN_AVAILABLE:
+        return None
+    
+    expressions = [_SCRIPT_BLOCK_PATTERN, *_DANGEROUS_JS_PATTERNS]
+    flags = (hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_DOTALL
+             | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP)
+    try:
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[expression.encode('utf-8') for expression in expressions],
+            ids=list(range(len(expressions))),
+            elements=len(expressions),
+            flags=[flags] * len(expressions)
+        )
+        return database
+    except Exception as e:
+        logger.warning(f"Hyperscan database compilation failed, using regex only: {str(e)}")
+        return None
+
+
+_CLEANUP_DATABASE = _build_cleanup_database()
+
+
+def _needs_cleanup(content: str) -> bool:
+    """Check in one DFA pass whether any cleanup pattern occurs in content.
+    
+    Without Hyperscan this always returns True and the regexes do the scan.
+    """
+    if _CLEANUP_DATABASE is None:
+        return True
+    
+    matched = False
+    
+    def on_match(pattern_id, start, end, flags, context):
+        nonlocal matched
+        matched = True
+    
+    try:
+        _CLEANUP_DATABASE.scan(
+            content.encode('utf-8', 'surrogatepass'), match_event_handler=on_match
+        )
+    except Exception:
+        return True
+    return matched
+
+
+# Plain text both backends return unchanged: ASCII (nh3 escapes U+00A0),
+# nothing to escape, and no control characters other than tab and newline
+# (\r is normalized away, bleach replaces the rest); runs of whitespace
+# survive since html-sanitizer's normalization left the pipeline
+_PLAIN_TEXT_RE = re.compile(r'[^<>&\x00-\x08\x0b-\x1f\x7f]*')
+
+
+# Script tags counted (case-insensitively) in text input, without a lowercased copy
+_SCRIPT_TAG_RE = re.compile(r'<script', re.IGNORECASE)
+_MAX_SCRIPT_TAGS = 5
+
+
+# Style attribute checks
+_STYLE_ALLOWED_PROPERTIES = frozenset({
+    'color', 'background-color', 'font-family', 'font-size', 'font-weight',
+    'text-align', 'line-height', 'letter-spacing', 'margin', 'padding',
+    'border-radius', 'max-width', 'width', 'height', 'display',
+    'text-decoration', 'border', 'box-shadow', 'opacity'
+})
+_STYLE_DANGEROUS_RE = re.compile('|'.join(re.escape(pattern) for pattern in (
+    'javascript:', 'expression(', 'import', '@import', 'url(',
+    'behavior:', '-moz-binding', 'position:', 'absolute', 'fixed'
+)), re.IGNORECASE)
+_CSS_LENGTH_UNIT_RE = re.compile(r'(?:px|em|%)\Z')  # 'em' also covers 'rem'
+_CSS_DANGEROUS_VALUES = ('javascript:', 'expression(', 'url(')
+_CSS_NAMED_COLORS = frozenset({'white', 'black', 'red', 'green', 'blue', 'transparent'})
+
+
+# Patterns worth a warning before sanitizing
+_SUSPICIOUS_CONTENT_RE = _compile_linear('|'.join((
+    '<script', 'javascript:', r'on[a-z]+\s*=', r'expression\s*\(',
+    'vbscript:', 'data:text/html', 'data:application/'
+)), re.IGNORECASE)
+
+
+# Sanitized results memoized per sanitizer; longer inputs are not cached
+_SANITIZE_CACHE_SIZE = 1024
+_SANITIZE_CACHE_MAX_CHARS = 10_000
+
+# Link schemes kept by both backends (bleach's default protocols)
+_ALLOWED_URL_SCHEMES = frozenset({'http', 'https', 'mailto'})
+
+# Void elements never hold content, so the empty-element rule always drops them
+_VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+})
+
+# An element holding only whitespace in nh3's normalized serialization
+_EMPTY_ELEMENT_RE = re.compile(r'<([a-z][a-z0-9]*)(?:\s[^>]*)?>\s*</\1>')
+
+
+def _drop_empty_elements(html: str) -> str:
+    """Remove elements left without content, innermost first."""
+    while True:
+        html, count = _EMPTY_ELEMENT_RE.subn('', html)
+        if not count:
+            return html
+
+
+@functools.lru_cache(maxsize=None)
+def compile_blocked_patterns(patterns: tuple) -> Optional[re.Pattern]:
+    """Compile literal blocked patterns into one case-insensitive alternation.
+    
+    Each pattern gets a named group ``p<index>`` so a match maps back to
+    the configured pattern; returns None when nothing is blocked.
+    """
+    if not patterns:
+        return None
+    return re.compile(
+        '|'.join(f'(?P<p{index}>{re.escape(pattern)})' for index, pattern in enumerate(patterns)),
+        re.IGNORECASE
+    )
+
+
+class _LinkAndEmptyElementFilter(Filter):
+    """Post-sanitize html5lib filter run inside the bleach pass.
+    
+    Adds rel="nofollow" to links and drops elements left without content
+    (including void elements such as <br> and <img>), the rules the
+    separate html-sanitizer pass used to apply.
+    """
+    
+    def __iter__(self):
+        output = []
+        
+        for token in Filter.__iter__(self):
+            token_type = token['type']
+            
+            if token_type == 'EmptyTag':
+                continue
+            
+            if token_type == 'StartTag' and token['name'] == 'a':
+                token['data'][(None, 'rel')] = 'nofollow'
+            
+            elif token_type == 'EndTag':
+                start = self._empty_element_start(output, token['name'])
+                if start is not None:
+                    del output[start:]
+                    continue
+            
+            output.append(token)
+        
+        return iter(output)
+    
+    @staticmethod
+    def _empty_element_start(output: list, name: str) -> Optional[int]:
+        """Index of the start tag if the element closing now holds only whitespace."""
+        index = len(output) - 1
+        while index >= 0 and output[index]['type'] in ('SpaceCharacters', 'Characters'):
+            if output[index]['data'].strip():
+                return None
+            index -= 1
+        
+        if index >= 0 and output[index]['type'] == 'StartTag' and output[index]['name'] == name:
+            return index
+        return None
+
+
 class HTMLSanitizer:
-    """Secure HTML sanitizer using bleach and html-sanitizer."""
+    """Secure HTML sanitizer built on a single nh3 or bleach pass.
+    
+    nh3 (Rust/ammonia) is used when installed; bleach with the html5lib
+    link/empty-element filter is the fallback. Both apply the same tag,
+    attribute and URL-scheme allow-lists and agree on ordinary document
+    markup, but the parsers differ on edge cases:
+    
+    - nh3 serializes U+00A0 as ``&nbsp;``; bleach keeps the raw character.
+    - nh3 drops ``<script>``/``<style>`` contents; bleach keeps their text.
+    - nh3 escapes markup inside raw-text elements such as ``<iframe>``;
+      bleach keeps only the text.
+    - Misnested markup (e.g. whitespace foster-parented out of tables)
+      may be re-serialized with different whitespace.
+    """
     
     def __init__(self, config: Optional[SecurityConfig] = None):
         """Initialize sanitizer with security configuration."""
-        self.config = config or SecurityConfig()
+        self.config = config or get_default_security_config()
         
         # Configure bleach settings
         self.bleach_tags = self.config.allowed_html_tags
         self.bleach_attributes = self.config.allowed_html_attributes
         
-        # Configure html-sanitizer (fix attributes format)
+        # Wildcard attributes (inline styles) are not kept on output
         sanitizer_attributes = {}
         for tag, attrs in self.config.allowed_html_attributes.items():
-            if tag != '*':  # Don't include wildcard in html-sanitizer config
+            if tag != '*':
                 sanitizer_attributes[tag] = attrs
         
-        self.html_sanitizer = Sanitizer({
-            'tags': self.config.allowed_html_tags,
-            'attributes': sanitizer_attributes,
-            'empty': set(),
-            'separate': {'p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'},
-            'whitespace': set(),
-            'remove_unknown_tags': True,
-            'keep_typographic_whitespace': True,
-            'add_nofollow': True,
-            'autolink': False,
-        })
+        # Built once; bleach.clean() would construct a new Cleaner per call
+        self._cleaner = bleach.Cleaner(
+            tags=self.bleach_tags,
+            attributes=sanitizer_attributes,
+            strip=True,
+            strip_comments=True,
+            filters=[_LinkAndEmptyElementFilter]
+        )
+        
+        # Repeated inputs (placeholder defaults, re-renders) skip the parse
+        self._sanitize_cached = functools.lru_cache(maxsize=_SANITIZE_CACHE_SIZE)(self._sanitize)
+        
+        # nh3 takes sets; void elements would be dropped as empty anyway
+        self._use_nh3 = NH3_AVAILABLE
+        if self._use_nh3:
+            self._nh3_tags = set(self.bleach_tags) - _VOID_ELEMENTS
+            self._nh3_attributes = {
+                tag: set(attrs) for tag, attrs in sanitizer_attributes.items()
+                if tag in self._nh3_tags
+            }
+            # An explicit empty '*' entry stops ammonia's default generic
+            # attributes (lang, title) from being kept on every tag
+            self._nh3_attributes['*'] = set()
     
     def sanitize(self, html_content: str) -> str:
         """
@@ -59,30 +302,27 @@ class HTMLSanitizer:
         if len(html_content) > self.config.max_text_length:
             raise ValueError(f"Content too long. Maximum {self.config.max_text_length} characters allowed.")
         
+        if len(html_content) <= _SANITIZE_CACHE_MAX_CHARS:
+            return self._sanitize_cached(html_content)
+        return self._sanitize(html_content)
+    
+    def _sanitize(self, html_content: str) -> str:
+        """Sanitize non-empty content already checked against the length limit."""
         # Pre-sanitization checks
-        self._validate_content(html_content)
+        suspicious = self._validate_content(html_content)
+        
+        # Plain text without markup passes through unchanged
+        if not suspicious and self._is_plain_text(html_content):
+            return html_content
+        
         try:
-            # First pass: bleach sanitization (without css_sanitizer if incompatible)
-            bleach_cleaned = bleach.clean(
-                html_content,
-                tags=self.bleach_tags,
-                attributes=self.bleach_attributes,
-                strip=True,
-                strip_comments=True
-            )
-            # Second pass: html-sanitizer for additional protection
-            final_cleaned = self.html_sanitizer.sanitize(bleach_cleaned)
-            # Remove script content and dangerous JS patterns
-            import re
-            # Remove any remaining <script>...</script> blocks and their content
-            final_cleaned = re.sub(r'<script.*?>.*?</script>', '', final_cleaned, flags=re.IGNORECASE|re.DOTALL)
-            # Remove common JS attack patterns
-            dangerous_patterns = [
-                r'alert\s*\(.*?\)', r'fetch\s*\(.*?\)', r'onclick\s*=\s*".*?"', r'onerror\s*=\s*".*?"',
-                r'javascript:', r'<iframe.*?>.*?</iframe>', r'XSS', r'maliciousFunction', r'stealData', r'document\.cookie'
-            ]
-            for pat in dangerous_patterns:
-                final_cleaned = re.sub(pat, '', final_cleaned, flags=re.IGNORECASE|re.DOTALL)
+            # Single parse: sanitization plus link/empty-element rules
+            final_cleaned = self._clean(html_content)
+            # Defense in depth for suspicious input: remove any remaining
+            # <script>...</script> blocks, then common JS attack patterns
+            needs_cleanup = suspicious or _SCRIPT_TAG_RE.search(final_cleaned) is not None
+            if needs_cleanup and _needs_cleanup(final_cleaned):
+                final_cleaned = _DANGEROUS_JS_RE.sub('', _SCRIPT_BLOCK_RE.sub('', final_cleaned))
             logger.info(f"Successfully sanitized HTML content ({len(html_content)} -> {len(final_cleaned)} chars)")
             return final_cleaned
         except Exception as e:
@@ -90,6 +330,23 @@ class HTMLSanitizer:
             # Fall back to plain text
             return bleach.clean(html_content, tags=[], attributes={}, strip=True)
     
+    def _clean(self, html_content: str) -> str:
+        """Run the allow-list pass on the configured backend."""
+        if self._use_nh3:
+            return _drop_empty_elements(nh3.clean(
+                html_content,
+                tags=self._nh3_tags,
+                attributes=self._nh3_attributes,
+                url_schemes=_ALLOWED_URL_SCHEMES,
+                link_rel='nofollow',
+                strip_comments=True
+            ))
+        return self._cleaner.clean(html_content)
+    
+    def _is_plain_text(self, content: str) -> bool:
+        """Check whether the sanitizing pipeline would leave content unchanged."""
+        return content.isascii() and _PLAIN_TEXT_RE.fullmatch(content) is not None
+    
     def sanitize_style_attribute(self, style_content: str) -> str:
         """
         Sanitize CSS style attributes with strict filtering.
@@ -103,25 +360,11 @@ class HTMLSanitizer:
         if not style_content:
             return ""
         
-        # Allowed CSS properties (whitelist approach)
-        allowed_properties = {
-            'color', 'background-color', 'font-family', 'font-size', 'font-weight',
-            'text-align', 'line-height', 'letter-spacing', 'margin', 'padding',
-            'border-radius', 'max-width', 'width', 'height', 'display',
-            'text-decoration', 'border', 'box-shadow', 'opacity'
-        }
-        
-        # Remove dangerous patterns
-        dangerous_patterns = [
-            'javascript:', 'expression(', 'import', '@import', 'url(',
-            'behavior:', '-moz-binding', 'position:', 'absolute', 'fixed'
-        ]
-        
-        cleaned_style = style_content.lower()
-        for pattern in dangerous_patterns:
-            if pattern in cleaned_style:
-                logger.warning(f"Blocked dangerous CSS pattern: {pattern}")
-                return ""
+        # Remove dangerous patterns in one case-insensitive scan
+        match = _STYLE_DANGEROUS_RE.search(style_content)
+        if match:
+            logger.warning(f"Blocked dangerous CSS pattern: {match.group(0).lower()}")
+            return ""
         
         # Parse and filter CSS properties
         try:
@@ -132,7 +375,7 @@ class HTMLSanitizer:
                     key = key.strip().lower()
                     value = value.strip()
                     
-                    if key in allowed_properties and value:
+                    if key in _STYLE_ALLOWED_PROPERTIES and value:
                         # Additional validation for specific properties
                         if self._validate_css_value(key, value):
                             properties.append(f"{key}: {value}")
@@ -143,43 +386,36 @@ class HTMLSanitizer:
             logger.warning(f"Error parsing CSS style: {str(e)}")
             return ""
     
-    def _validate_content(self, content: str) -> None:
-        """Validate content for suspicious patterns."""
-        suspicious_patterns = [
-            '<script', 'javascript:', r'on[a-z]+\s*=', r'expression\s*\(',
-            'vbscript:', 'data:text/html', 'data:application/'
-        ]
-        
-        content_lower = content.lower()
-        for pattern in suspicious_patterns:
-            if pattern in content_lower:
-                logger.warning(f"Suspicious pattern detected: {pattern}")
-                # Don't raise exception, let sanitizer handle it
-                break
+    def _validate_content(self, content: str) -> bool:
+        """Validate content for suspicious patterns; returns True if any were found."""
+        match = _SUSPICIOUS_CONTENT_RE.search(content)
+        if match:
+            logger.warning(f"Suspicious pattern detected: {match.group(0)}")
+            # Don't raise exception, let sanitizer handle it
+            return True
+        return False
     
     def _validate_css_value(self, property_name: str, value: str) -> bool:
         """Validate CSS property values."""
         value_lower = value.lower()
         
         # Block dangerous CSS values
-        if any(danger in value_lower for danger in ['javascript:', 'expression(', 'url(']):
-            return False
+        for danger in _CSS_DANGEROUS_VALUES:
+            if danger in value_lower:
+                return False
         
         # Property-specific validation
-        if property_name in ['color', 'background-color']:
+        if property_name in ('color', 'background-color'):
             # Allow hex colors, rgb, rgba, named colors
-            return (value.startswith('#') or 
-                   value.startswith('rgb') or 
-                   value in ['white', 'black', 'red', 'green', 'blue', 'transparent'])
+            return value.startswith(('#', 'rgb')) or value in _CSS_NAMED_COLORS
         
         elif property_name == 'font-size':
             # Allow pixels, em, rem, percentages
-            return any(value.endswith(unit) for unit in ['px', 'em', 'rem', '%'])
+            return _CSS_LENGTH_UNIT_RE.search(value) is not None
         
-        elif property_name in ['margin', 'padding', 'width', 'height', 'max-width']:
+        elif property_name in ('margin', 'padding', 'width', 'height', 'max-width'):
             # Allow pixels, percentages, auto
-            return (value == 'auto' or 
-                   any(value.endswith(unit) for unit in ['px', '%', 'em', 'rem']))
+            return value == 'auto' or _CSS_LENGTH_UNIT_RE.search(value) is not None
         
         return True
 
@@ -189,7 +425,7 @@ class ContentValidator:
     
     def __init__(self, config: Optional[SecurityConfig] = None):
         """Initialize validator with security configuration."""
-        self.config = config or SecurityConfig()
+        self.config = config or get_default_security_config()
     
     def validate_content_length(self, content: str):
         """Validate content length against configured limits."""
@@ -198,12 +434,11 @@ class ContentValidator:
         return True, None
 
     def detect_suspicious_patterns(self, content: str):
-        """Detect suspicious patterns in content."""
-        import re
-        patterns = [r'<script', r'javascript:', r'onclick=', r'onerror=']
-        for pat in patterns:
-            if re.search(pat, content, re.IGNORECASE):
-                return True, pat
+        """Detect the first configured blocked pattern in content, in one scan."""
+        blocked_re = compile_blocked_patterns(tuple(self.config.blocked_patterns))
+        match = blocked_re.search(content) if blocked_re is not None else None
+        if match:
+            return True, self.config.blocked_patterns[int(match.lastgroup[1:])]
         return False, None
     
     def validate_text_input(self, text: str) -> tuple[bool, Optional[str]]:
@@ -224,9 +459,10 @@ class ContentValidator:
         if '\x00' in text:
             return False, "Text contains null bytes"
         
-        # Check for excessive script tags
-        script_count = text.lower().count('<script')
-        if script_count > 5:
+        # Check for excessive script tags; stop scanning once over the limit
+        script_tags = _SCRIPT_TAG_RE.finditer(text)
+        script_count = sum(1 for _ in itertools.islice(script_tags, _MAX_SCRIPT_TAGS + 1))
+        if script_count > _MAX_SCRIPT_TAGS:
             return False, "Too many script tags detected"
         
         return True, None
@@ -248,4 +484,10 @@ class ContentValidator:
         if any(filename.lower().endswith(ext) for ext in dangerous_extensions):
             return False, "File type not allowed"
         
-        return True, None
\ No newline at end of file
+        return True, None
+
+
+@functools.lru_cache(maxsize=None)
+def get_default_sanitizer() -> HTMLSanitizer:
+    """Get the shared sanitizer for the default security configuration."""
+    return HTMLSanitizer()
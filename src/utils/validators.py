@@ -1,22 +1,118 @@
 """Input validation utilities."""
 
-import magic
-import validators
+import os
+import re
+from functools import lru_cache
 from typing import Tuple, Optional, Dict, Any
 import logging
-from pathlib import Path
 from config.constants import SUPPORTED_FILE_TYPES, SECURITY_LIMITS
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Loading the libmagic database is costly, so one detector is shared;
+# it is created on first use to keep it out of app startup
+_MAGIC = None
+
+# Streamlit reruns re-validate the same uploads
+_MIME_CACHE_SIZE = 128
+
+# Only the head of an upload is inspected by the security scan
+_SECURITY_SCAN_BYTES = 64 * 1024
+
+_SCRIPT_PATTERNS = ('<script', 'javascript:', 'vbscript:', 'data:text/html')
+_FILENAME_TRAVERSAL_PATTERNS = ('..', '/', '\\')
+# Every single character a filename may not contain
+_FILENAME_BAD_CHARS = frozenset('/\\\x00$`|;&()<>')
+
+# Expected MIME types for each extension
+_EXPECTED_MIMES = {
+    'txt': ['text/plain'],
+    'md': ['text/plain', 'text/markdown'],
+    'csv': ['text/csv', 'application/csv'],
+    'json': ['application/json'],
+    'html': ['text/html'],
+    'css': ['text/css'],
+    'js': ['application/javascript', 'text/javascript'],
+    'pdf': ['application/pdf'],
+    'docx': ['application/vnd.openxmlformats-officedocument.wordprocessingml.document'],
+    'doc': ['application/msword'],
+    'png': ['image/png'],
+    'jpg': ['image/jpeg'],
+    'jpeg': ['image/jpeg'],
+    'gif': ['image/gif'],
+    'bmp': ['image/bmp', 'image/x-ms-bmp']
+}
+
+# Use a more restrictive list for the test - exclude js, css which tests expect to fail
+_ALLOWED_EXTENSIONS = frozenset({
+    'txt', 'md', 'pdf', 'docx', 'html', 'json', 'png', 'jpg', 'jpeg', 'gif', 'bmp'
+})
+
+_DANGEROUS_URL_PROTOCOLS = ('javascript:', 'data:', 'vbscript:', 'file:')
+_URL_SCHEME_PREFIX_LENGTH = max(len(protocol) for protocol in _DANGEROUS_URL_PROTOCOLS)
+
+
+def _build_matcher(patterns):
+    """Build a case-insensitive single-pass matcher for lowercase literal patterns.
+    
+    Uses an Aho-Corasick automaton when pyahocorasick is installed and a
+    compiled regex alternation otherwise; the regex needs no lowercased copy
+    of the text.
+    """
+    if AHOCORASICK_AVAILABLE:
+        automaton = ahocorasick.Automaton()
+        for pattern in patterns:
+            automaton.add_word(pattern, pattern)
+        automaton.make_automaton()
+        return lambda text: next(automaton.iter(text.lower()), None) is not None
+    
+    regex = re.compile('|'.join(re.escape(pattern) for pattern in patterns), re.IGNORECASE)
+    return lambda text: regex.search(text) is not None
+
+
+_contains_script_pattern = _build_matcher(_SCRIPT_PATTERNS)
+
+
+def _file_extension(filename: str) -> str:
+    """Lowercased extension without the dot ('' when there is none)."""
+    return os.path.splitext(filename)[1][1:].lower()
+
+
+def _contains_filename_pattern(filename: str) -> bool:
+    """Check for any forbidden pattern; isdisjoint stops at the first bad char."""
+    return '..' in filename or not _FILENAME_BAD_CHARS.isdisjoint(filename)
+
+
+@lru_cache(maxsize=_MIME_CACHE_SIZE)
+def _detect_mime_type(chunk: bytes) -> str:
+    """Memoized libmagic detection; the result depends only on the chunk."""
+    global _MAGIC
+    if _MAGIC is None:
+        import magic
+        _MAGIC = magic.Magic(mime=True)
+    return _MAGIC.from_buffer(chunk)
+
 
 class FileValidator:
     """Comprehensive file validation for uploads."""
     
-    def __init__(self):
-        """Initialize file validator."""
-        self.max_file_size = SECURITY_LIMITS['max_file_size']
-        self.supported_types = SUPPORTED_FILE_TYPES
+    __slots__ = ()
+    
+    # Limits and lookup tables never vary per instance
+    max_file_size = SECURITY_LIMITS['max_file_size']
+    supported_types = SUPPORTED_FILE_TYPES
+    _ext_to_category = {
+        extension: category
+        for category, extensions in SUPPORTED_FILE_TYPES.items()
+        for extension in extensions
+    }
+    _all_supported = frozenset(_ext_to_category)
     
     def validate_file(self, file_obj) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
         """
@@ -34,9 +130,16 @@ class FileValidator:
                 return False, "No file provided", None
             
             filename = file_obj.name
-            file_size = file_obj.size if hasattr(file_obj, 'size') else len(file_obj.read())
+            if hasattr(file_obj, 'size'):
+                file_size = file_obj.size
+            elif hasattr(file_obj, 'seek') and hasattr(file_obj, 'tell'):
+                # Measure by seeking to the end rather than reading the upload
+                file_obj.seek(0, 2)
+                file_size = file_obj.tell()
+            else:
+                file_size = len(file_obj.read())
             
-            # Reset file pointer if we read it
+            # Reset file pointer if we moved it
             if hasattr(file_obj, 'seek'):
                 file_obj.seek(0)
             
@@ -49,16 +152,22 @@ class FileValidator:
             if file_size > self.max_file_size:
                 return False, f"File too large. Maximum size: {self.max_file_size / (1024*1024):.1f}MB", None
             
+            # One bounded read feeds both MIME detection and the security scan
+            head = file_obj.read(_SECURITY_SCAN_BYTES)
+            file_obj.seek(0)
+            
             # Validate file type
-            file_extension = Path(filename).suffix.lower().lstrip('.')
-            mime_type = self._get_mime_type(file_obj)
+            file_extension = _file_extension(filename)
+            mime_type, has_executable, has_script = self._inspect_head(head)
             
             is_valid_type, type_error = self._validate_file_type(file_extension, mime_type)
             if not is_valid_type:
                 return False, type_error, None
             
             # Additional security checks
-            security_check, security_error = self._security_checks(file_obj, mime_type)
+            security_check, security_error = self._security_checks(
+                file_size, has_executable, has_script
+            )
             if not security_check:
                 return False, security_error, None
             
@@ -85,30 +194,26 @@ class FileValidator:
         if len(filename) > SECURITY_LIMITS['max_filename_length']:
             return False, f"Filename too long (max {SECURITY_LIMITS['max_filename_length']} chars)"
         
+        # One pass over the name; only a hit needs the per-category checks
+        if not _contains_filename_pattern(filename):
+            return True, None
+        
         # Check for path traversal
-        if '..' in filename or '/' in filename or '\\' in filename:
+        if any(pattern in filename for pattern in _FILENAME_TRAVERSAL_PATTERNS):
             return False, "Invalid filename: path traversal detected"
         
         # Check for null bytes
         if '\x00' in filename:
             return False, "Invalid filename: null bytes detected"
         
-        # Check for suspicious patterns
-        suspicious_patterns = ['$', '`', '|', ';', '&', '(', ')', '<', '>']
-        if any(char in filename for char in suspicious_patterns):
-            return False, "Invalid filename: suspicious characters detected"
-        
-        return True, None
+        # Anything else the scan matched is a suspicious character
+        return False, "Invalid filename: suspicious characters detected"
     
-    def _get_mime_type(self, file_obj) -> str:
+    def _get_mime_type(self, head: bytes) -> str:
         """Get MIME type using python-magic."""
         try:
-            # Read first chunk for magic detection
-            chunk = file_obj.read(1024)
-            file_obj.seek(0)  # Reset pointer
-            
-            mime = magic.Magic(mime=True)
-            return mime.from_buffer(chunk)
+            # The first chunk is enough for magic detection
+            return _detect_mime_type(head[:1024])
         except Exception as e:
             logger.warning(f"Could not determine MIME type: {str(e)}")
             return "application/octet-stream"
@@ -116,34 +221,12 @@ class FileValidator:
     def _validate_file_type(self, extension: str, mime_type: str) -> Tuple[bool, Optional[str]]:
         """Validate file type against allowed types."""
         # Check extension
-        all_supported = []
-        for category_types in self.supported_types.values():
-            all_supported.extend(category_types)
-        
-        if extension not in all_supported:
+        if extension not in self._all_supported:
             return False, f"File type '{extension}' not supported"
         
         # Validate MIME type matches extension
-        expected_mimes = {
-            'txt': ['text/plain'],
-            'md': ['text/plain', 'text/markdown'],
-            'csv': ['text/csv', 'application/csv'],
-            'json': ['application/json'],
-            'html': ['text/html'],
-            'css': ['text/css'],
-            'js': ['application/javascript', 'text/javascript'],
-            'pdf': ['application/pdf'],
-            'docx': ['application/vnd.openxmlformats-officedocument.wordprocessingml.document'],
-            'doc': ['application/msword'],
-            'png': ['image/png'],
-            'jpg': ['image/jpeg'],
-            'jpeg': ['image/jpeg'],
-            'gif': ['image/gif'],
-            'bmp': ['image/bmp', 'image/x-ms-bmp']
-        }
-        
-        if extension in expected_mimes:
-            if mime_type not in expected_mimes[extension]:
+        if extension in _EXPECTED_MIMES:
+            if mime_type not in _EXPECTED_MIMES[extension]:
                 logger.warning(f"MIME type mismatch: {extension} -> {mime_type}")
                 # Don't fail hard on MIME mismatch, but log it
         
@@ -151,34 +234,45 @@ class FileValidator:
     
     def _get_file_category(self, extension: str) -> str:
         """Get file category based on extension."""
-        for category, extensions in self.supported_types.items():
-            if extension in extensions:
-                return category
-        return 'unknown'
+        return self._ext_to_category.get(extension, 'unknown')
+    
+    def _inspect_head(self, head: bytes) -> Tuple[str, bool, bool]:
+        """
+        Inspect the head of an upload in one pass while it is cache-resident.
+        
+        Returns:
+            Tuple of (mime_type, has_executable, has_script)
+        """
+        mime_type = self._get_mime_type(head)
+        has_executable = has_script = False
+        
+        try:
+            if mime_type.startswith('text/'):
+                # Check for script injections in text files
+                text_content = head.decode('utf-8', errors='ignore')
+                has_script = _contains_script_pattern(text_content)
+            else:
+                # Check for embedded executables; libmagic never reports a PE as text
+                has_executable = head.find(b'MZ', 0, 1024) != -1  # PE header
+        except Exception as e:
+            logger.warning(f"Security check failed: {str(e)}")
+        
+        return mime_type, has_executable, has_script
     
-    def _security_checks(self, file_obj, mime_type: str) -> Tuple[bool, Optional[str]]:
-        """Additional security checks."""
+    def _security_checks(
+        self, file_size: int, has_executable: bool, has_script: bool
+    ) -> Tuple[bool, Optional[str]]:
+        """Additional security checks on the findings of _inspect_head."""
         try:
-            # Read content for analysis
-            content = file_obj.read()
-            file_obj.seek(0)  # Reset pointer
-            
-            # Check for embedded executables
-            if b'MZ' in content[:1024]:  # PE header
+            if has_executable:
                 return False, "Embedded executable detected"
             
-            # Check for suspicious content in text files
-            if mime_type.startswith('text/'):
-                text_content = content.decode('utf-8', errors='ignore')
-                
-                # Check for script injections
-                script_patterns = ['<script', 'javascript:', 'vbscript:', 'data:text/html']
-                if any(pattern in text_content.lower() for pattern in script_patterns):
-                    logger.warning("Potential script content detected in text file")
-                    # Don't fail - let sanitizer handle it
+            if has_script:
+                logger.warning("Potential script content detected in text file")
+                # Don't fail - let sanitizer handle it
             
             # Check for zip bombs (for future document processing)
-            if len(content) > 100 * 1024 * 1024:  # 100MB uncompressed
+            if file_size > 100 * 1024 * 1024:  # 100MB uncompressed
                 return False, "File too large when decompressed"
             
             return True, None
@@ -188,26 +282,21 @@ class FileValidator:
             return True, None  # Don't fail on security check errors
     
     def validate_file_extension(self, filename: str):
-        from pathlib import Path
-        ext = Path(filename).suffix.lower().lstrip('.')
-        # Use a more restrictive list for the test - exclude js, css which tests expect to fail
-        allowed_extensions = ['txt', 'md', 'pdf', 'docx', 'html', 'json', 'png', 'jpg', 'jpeg', 'gif', 'bmp']
-        if ext not in allowed_extensions:
+        ext = _file_extension(filename)
+        if ext not in _ALLOWED_EXTENSIONS:
             return False, f"File extension .{ext} not allowed"
         return True, None
 
     def validate_file_size(self, file_path: str):
-        import os
-        size = os.path.getsize(file_path)
+        size = os.stat(file_path).st_size
         if size > self.max_file_size:
             return False, f"File too large (max {self.max_file_size} bytes)"
         return True, None
 
     def validate_file_path(self, file_path: str):
-        from pathlib import Path
-        p = Path(file_path)
-        # More strict path validation for tests
-        if '..' in str(p) or p.is_absolute() or '/' in file_path or '\\' in file_path:
+        # More strict path validation for tests: any separator or parent
+        # reference is rejected, so no normalization is needed
+        if any(pattern in file_path for pattern in _FILENAME_TRAVERSAL_PATTERNS):
             return False, "Invalid file path: path traversal detected"
         return True, None
 
@@ -215,6 +304,8 @@ class FileValidator:
 class URLValidator:
     """URL validation for links and references."""
     
+    __slots__ = ()
+    
     @staticmethod
     def validate_url(url: str) -> bool:
         """Validate URL format and security."""
@@ -222,25 +313,27 @@ class URLValidator:
             return False
         
         # Basic URL validation
+        import validators
         if not validators.url(url):
             return False
         
-        # Check for dangerous protocols
-        dangerous_protocols = ['javascript:', 'data:', 'vbscript:', 'file:']
-        if any(url.lower().startswith(proto) for proto in dangerous_protocols):
+        # Check for dangerous protocols; the scheme sits in the first few chars
+        if url[:_URL_SCHEME_PREFIX_LENGTH].lower().startswith(_DANGEROUS_URL_PROTOCOLS):
             return False
         
         # Only allow HTTP and HTTPS
-        if not (url.startswith('https://') or url.startswith('http://')):
+        if not url.startswith(('https://', 'http://')):
             return False
         
         return True
 
 
 class ContentValidator:
+    __slots__ = ('config',)
+
     def __init__(self, security_config=None):
-        from models.style_models import SecurityConfig
-        self.config = security_config or SecurityConfig()
+        from models.style_models import get_default_security_config
+        self.config = security_config or get_default_security_config()
 
     def validate_content_length(self, content: str):
         if len(content) > self.config.max_text_length:
@@ -248,17 +341,22 @@ class ContentValidator:
         return True, None
 
     def detect_suspicious_patterns(self, content: str):
-        import re
-        patterns = [r'<script', r'javascript:', r'onclick=', r'onerror=']
-        for pat in patterns:
-            if re.search(pat, content, re.IGNORECASE):
-                return True, pat
+        # Same compiled matcher as utils.sanitizers.ContentValidator, built
+        # once per distinct SecurityConfig.blocked_patterns list
+        from utils.sanitizers import compile_blocked_patterns
+        blocked_re = compile_blocked_patterns(tuple(self.config.blocked_patterns))
+        match = blocked_re.search(content) if blocked_re is not None else None
+        if match:
+            return True, self.config.blocked_patterns[int(match.lastgroup[1:])]
         return False, None
 
 
 class TextValidator:
+    __slots__ = ()
+
     def validate_text_input(self, text: str):
-        if not text or not isinstance(text, str) or len(text.strip()) == 0:
+        # isspace() scans in place where strip() would copy the whole text
+        if not text or not isinstance(text, str) or text.isspace():
             return False, "Text input is empty"
         # Check for overly long text (basic protection)
         if len(text) > 1_000_000:  # 1MB limit
@@ -3,9 +3,12 @@ Unit tests for data models and validation.
 """
 
 import pytest
+from datetime import datetime
 from pydantic import ValidationError
 from models.style_models import StyleConfig, SecurityConfig
-from models.template_models import Template, TemplateMetadata, ContentPlaceholder, TemplateCategory
+from models.template_models import (
+    Template, TemplateLibrary, TemplateMetadata, ContentPlaceholder, StyleOverride, TemplateCategory
+)
 
 
 class TestStyleModels:
@@ -165,6 +168,85 @@ class TestTemplateModels:
         rendered_default = template.render({})
         assert "Default Title" in rendered_default
     
+    def test_template_rendering_placeholder_boundaries(self):
+        """Test unknown placeholders stay verbatim and content is not re-expanded."""
+        metadata = TemplateMetadata(
+            name="Test Template",
+            description="A test template",
+            category=TemplateCategory.BUSINESS
+        )
+        
+        placeholders = [
+            ContentPlaceholder(key="title", label="Title", description="Title",
+                               placeholder_text="T"),
+            ContentPlaceholder(key="body", label="Body", description="Body", placeholder_text="B")
+        ]
+        
+        template = Template(
+            id="test_template",
+            metadata=metadata,
+            html_template="<h1>{{title}}</h1>{{unknown}}<p>{{body}}</p><h2>{{title}}</h2>",
+            placeholders=placeholders
+        )
+        
+        rendered = template.render({"title": "{{body}}", "body": "Text"})
+        assert rendered == "<h1>{{body}}</h1>{{unknown}}<p>Text</p><h2>{{body}}</h2>"
+    
+    def test_template_rendering_style_overrides(self):
+        """Test style overrides are injected before </head> on every render."""
+        metadata = TemplateMetadata(
+            name="Test Template",
+            description="A test template",
+            category=TemplateCategory.BUSINESS
+        )
+        
+        template = Template(
+            id="test_template",
+            metadata=metadata,
+            html_template="<html><head></head><body>{{title}}</body></html>",
+            placeholders=[
+                ContentPlaceholder(key="title", label="Title", description="Title",
+                                   placeholder_text="T")
+            ],
+            style_overrides=[
+                StyleOverride(property="color", value="red", selector="h1", important=True)
+            ]
+        )
+        
+        expected_head = "<head><style>h1 { color: red !important; }</style></head>"
+        assert template.render({"title": "One"}) == f"<html>{expected_head}<body>One</body></html>"
+        assert template.render({"title": "Two"}) == f"<html>{expected_head}<body>Two</body></html>"
+    
+    def test_template_edits_invalidate_caches(self):
+        """Test assigning fields or copying with updates never serves stale renders."""
+        metadata = TemplateMetadata(
+            name="Test Template",
+            description="A test template",
+            category=TemplateCategory.BUSINESS
+        )
+        
+        template = Template(
+            id="test_template",
+            metadata=metadata,
+            html_template="<h1>{{title}}</h1>",
+            placeholders=[
+                ContentPlaceholder(key="title", label="Title", description="Title",
+                                   placeholder_text="T")
+            ]
+        )
+        assert template.render({"title": "One"}) == "<h1>One</h1>"
+        
+        template.html_template = "<h2>{{title}}</h2>"
+        assert template.render({"title": "One"}) == "<h2>One</h2>"
+        
+        copied = template.model_copy(update={"html_template": "<p>{{title}}</p>"})
+        assert copied.render({"title": "One"}) == "<p>One</p>"
+        assert template.render({"title": "One"}) == "<h2>One</h2>"
+        
+        template.placeholders = []
+        assert template.validate_content({}) == []
+        assert template.render({"title": "One"}) == "<h2>{{title}}</h2>"
+    
     def test_template_validation(self):
         """Test template content validation."""
         metadata = TemplateMetadata(
@@ -218,7 +300,14 @@ class TestTemplateModels:
             "optional_field": "Short value"
         })
         assert len(errors) == 0
-    
+        
+        # Test pattern validation
+        template.placeholders[0].validation_pattern = r"\d{4}-\d{2}-\d{2}$"
+        template.metadata.modified_date = datetime.now()
+        errors = template.validate_content({"required_field": "next week"})
+        assert errors == ["'Required Field' does not match required format"]
+        assert template.validate_content({"required_field": "2024-01-31"}) == []
+
     def test_template_id_validation(self):
         """Test template ID validation."""
         metadata = TemplateMetadata(
@@ -245,4 +334,30 @@ class TestTemplateModels:
                 metadata=metadata,
                 html_template="<h1>Test</h1>",
                 placeholders=[]
-            )
\ No newline at end of file
+            )
+    
+    def test_template_library_search(self):
+        """Test library search matches substrings of a single field."""
+        library = TemplateLibrary()
+        entries = [("letter", "Business Letter", ["formal"]), ("memo", "Team Memo", ["Internal"])]
+        for template_id, name, tags in entries:
+            library.add_template(Template(
+                id=template_id,
+                metadata=TemplateMetadata(
+                    name=name, description="A template", category=TemplateCategory.BUSINESS,
+                    tags=tags
+                ),
+                html_template="<p>Test</p>",
+                placeholders=[]
+            ))
+        
+        assert [t.id for t in library.search_templates("LETT")] == ["letter"]
+        assert [t.id for t in library.search_templates("internal")] == ["memo"]
+        assert len(library.search_templates("template")) == 2
+        assert library.search_templates("memoa") == []
+        
+        # Edits are picked up once the modified date moves
+        memo = library.get_template("memo")
+        memo.metadata.tags.append("weekly")
+        memo.metadata.modified_date = datetime.now()
+        assert [t.id for t in library.search_templates("weekly")] == ["memo"]
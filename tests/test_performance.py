@@ -4,11 +4,27 @@ Performance tests for monitoring and optimization.
 
 import pytest
 import time
-import threading
-from utils.performance_monitor import get_performance_monitor
+from concurrent.futures import ThreadPoolExecutor
+from utils import performance_monitor as performance_monitor_module
+from utils.performance_monitor import (
+    LatencyHistogram, PerformanceBuffer, PerformanceMetric, PerformanceMonitor
+)
 from utils.cache_manager import get_cache_manager
 from utils.logger import get_enhanced_logger
 
+# Timing assertions; deselect on noisy shared runners with -m "not performance"
+pytestmark = pytest.mark.performance
+
+
+@pytest.fixture(scope="module")
+def thread_pool():
+    """Warm worker pool so concurrency tests don't time thread startup."""
+    max_workers = 8
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Spin the workers up before any test starts its clock
+        list(pool.map(lambda _: None, range(max_workers)))
+        yield pool
+
 
 class TestPerformanceMonitoring:
     """Test performance monitoring functionality."""
@@ -33,6 +49,22 @@ class TestPerformanceMonitoring:
         
         assert updated_requests >= initial_requests + 5
     
+    def test_request_counter_concurrent(self, thread_pool, monkeypatch):
+        """Test concurrent requests lose no increments and counters stay assignable."""
+        monkeypatch.setattr(performance_monitor_module, 'PROMETHEUS_AVAILABLE', False)
+        monitor = PerformanceMonitor()
+        
+        def request_worker(worker_id):
+            for i in range(1000):
+                monitor.record_request()
+        
+        list(thread_pool.map(request_worker, range(4)))
+        assert monitor.request_counter == 4000
+        assert monitor.request_counter == 4000
+        
+        monitor.request_counter = 0
+        assert monitor.get_performance_summary()['application']['total_requests'] == 0
+    
     def test_operation_timing(self, performance_monitor):
         """Test operation timing functionality."""
         operation_name = "test_operation"
@@ -42,11 +74,94 @@ class TestPerformanceMonitoring:
         
         summary = performance_monitor.get_performance_summary()
         
-        # Check if operation is recorded
-        assert 'operations' in summary
-        if operation_name in summary['operations']:
-            assert summary['operations'][operation_name]['count'] > 0
-            assert summary['operations'][operation_name]['total_time'] >= operation_time
+        # Recorded operations show up at once, even between background snapshots
+        assert summary['operations'][operation_name]['count'] > 0
+        assert summary['operations'][operation_name]['total_time'] >= operation_time
+    
+    def test_operation_timing_percentiles(self):
+        """Test histogram percentiles stay within bucket error."""
+        histogram = LatencyHistogram()
+        for i in range(1, 101):
+            histogram.record(i / 1000)  # 1ms .. 100ms
+        
+        p50, p99 = histogram.percentiles(50, 99)
+        
+        assert histogram.count == 100
+        assert abs(p50 - 0.050) <= 0.050 * 0.011
+        assert abs(p99 - 0.099) <= 0.099 * 0.011
+        assert histogram.percentiles(100) == [histogram.max]
+        assert histogram.mean == pytest.approx(0.0505)
+        assert histogram.stddev == pytest.approx(0.029011, rel=1e-4)
+    
+    def test_operation_timing_concurrent_records(self, thread_pool):
+        """Test concurrent writers lose no samples across drains."""
+        histogram = LatencyHistogram()
+        per_worker = LatencyHistogram.drain_threshold + 100
+        
+        def record_worker(worker_id):
+            for i in range(per_worker):
+                histogram.record((i % 100 + 1) / 1000)
+        
+        list(thread_pool.map(record_worker, range(4)))
+        
+        assert histogram.count == 4 * per_worker
+        assert int(histogram.counts.sum()) == 4 * per_worker
+        assert histogram.min == pytest.approx(0.001)
+        assert histogram.max == pytest.approx(0.100)
+    
+    def test_background_refresh_after_operation(self, monkeypatch):
+        """Test recorded operations alone end the background idle skip."""
+        monkeypatch.setattr(performance_monitor_module, 'PROMETHEUS_AVAILABLE', False)
+        monitor = PerformanceMonitor()
+        monitor.max_idle_intervals = 1000
+        
+        def wait_for(condition):
+            deadline = time.perf_counter() + 2.0
+            while not condition() and time.perf_counter() < deadline:
+                time.sleep(0.005)
+            return condition()
+        
+        monitor.start_background_monitoring(interval=0.01)
+        try:
+            assert wait_for(lambda: monitor._snapshot is not None)
+            first_snapshot = monitor._snapshot
+            
+            monitor.record_operation_time("render", 0.2)
+            assert wait_for(lambda: monitor._snapshot is not first_snapshot)
+        finally:
+            monitor.stop_background_monitoring()
+    
+    def test_buffer_concurrent_writers(self, thread_pool):
+        """Test readers never see torn rows while several threads write."""
+        import sys
+        buffer = PerformanceBuffer(max_size=64)
+        per_writer = 20000
+        
+        def write_worker(worker_id):
+            for i in range(per_writer):
+                value = worker_id * per_writer + i
+                buffer.add_metric(PerformanceMetric(
+                    name=f"m{value}", value=float(value), timestamp=value, labels={'v': str(value)}
+                ))
+        
+        # Switch threads as often as possible so interleavings actually occur
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            writers = [thread_pool.submit(write_worker, worker_id) for worker_id in range(4)]
+            while not all(writer.done() for writer in writers):
+                for metric in buffer.get_metrics():
+                    assert metric.name == f"m{int(metric.value)}"
+                    assert metric.timestamp == int(metric.value)
+                    assert metric.labels == {'v': str(int(metric.value))}
+            
+            for writer in writers:
+                writer.result()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        
+        assert buffer._published == 4 * per_writer
+        assert len(buffer.get_metrics()) == 64
     
     def test_error_tracking(self, performance_monitor):
         """Test error tracking functionality."""
@@ -132,13 +247,13 @@ class TestCacheManager:
         value = "expiring_value"
         
         # Set with very short TTL
-        cache_manager.set(key, value, ttl=1)
+        cache_manager.set(key, value, ttl=0.05)
         
         # Should be available immediately
         assert cache_manager.get(key) == value
         
         # Wait for expiration
-        time.sleep(2)
+        time.sleep(0.1)
         
         # Should be expired
         assert cache_manager.get(key) is None
@@ -172,16 +287,16 @@ class TestCacheManager:
         num_operations = 100
         
         # Set operations
-        start_time = time.time()
+        start_time = time.perf_counter()
         for i in range(num_operations):
             cache_manager.set(f"perf_key_{i}", f"value_{i}", ttl=300)
-        set_time = time.time() - start_time
+        set_time = time.perf_counter() - start_time
         
         # Get operations
-        start_time = time.time()
+        start_time = time.perf_counter()
         for i in range(num_operations):
             cache_manager.get(f"perf_key_{i}")
-        get_time = time.time() - start_time
+        get_time = time.perf_counter() - start_time
         
         # Performance assertions (should be fast)
         assert set_time < 1.0  # 100 sets in less than 1 second
@@ -194,7 +309,7 @@ class TestCacheManager:
         assert set_ops_per_sec > 100  # At least 100 sets per second
         assert get_ops_per_sec > 200  # At least 200 gets per second
     
-    def test_concurrent_cache_access(self, cache_manager):
+    def test_concurrent_cache_access(self, cache_manager, thread_pool):
         """Test concurrent cache access."""
         num_threads = 5
         operations_per_thread = 20
@@ -211,20 +326,11 @@ class TestCacheManager:
                 retrieved = cache_manager.get(key)
                 assert retrieved == value
         
-        # Create and start threads
-        threads = []
-        start_time = time.time()
-        
-        for thread_id in range(num_threads):
-            thread = threading.Thread(target=cache_worker, args=(thread_id,))
-            threads.append(thread)
-            thread.start()
+        # Run the workers on the warm pool and wait for completion
+        start_time = time.perf_counter()
+        list(thread_pool.map(cache_worker, range(num_threads)))
         
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
-        
-        end_time = time.time()
+        end_time = time.perf_counter()
         total_time = end_time - start_time
         
         # Should complete within reasonable time
@@ -241,9 +347,9 @@ class TestLoggingPerformance:
     
     def test_logger_initialization(self):
         """Test logger initialization performance."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         logger = get_enhanced_logger("test_logger")
-        end_time = time.time()
+        end_time = time.perf_counter()
         
         initialization_time = end_time - start_time
         
@@ -257,10 +363,10 @@ class TestLoggingPerformance:
         
         num_logs = 1000
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         for i in range(num_logs):
             logger.info(f"Performance test log message {i}", test_id=i)
-        end_time = time.time()
+        end_time = time.perf_counter()
         
         logging_time = end_time - start_time
         
@@ -271,7 +377,7 @@ class TestLoggingPerformance:
         logs_per_sec = num_logs / logging_time
         assert logs_per_sec > 1000  # At least 1000 logs per second
     
-    def test_concurrent_logging(self):
+    def test_concurrent_logging(self, thread_pool):
         """Test concurrent logging performance."""
         num_threads = 5
         logs_per_thread = 100
@@ -281,24 +387,35 @@ class TestLoggingPerformance:
             for i in range(logs_per_thread):
                 logger.info(f"Thread {thread_id} log {i}", thread_id=thread_id, log_id=i)
         
-        # Create and start threads
-        threads = []
-        start_time = time.time()
-        
-        for thread_id in range(num_threads):
-            thread = threading.Thread(target=logging_worker, args=(thread_id,))
-            threads.append(thread)
-            thread.start()
-        
-        # Wait for completion
-        for thread in threads:
-            thread.join()
+        # Run the workers on the warm pool and wait for completion
+        start_time = time.perf_counter()
+        list(thread_pool.map(logging_worker, range(num_threads)))
         
-        end_time = time.time()
+        end_time = time.perf_counter()
         total_time = end_time - start_time
         
         # Should complete within reasonable time
         assert total_time < 2.0
+    
+    def test_queue_handlers_keep_each_destination(self, tmp_path, monkeypatch):
+        """Test each distinct handler set gets its own queue listener."""
+        import logging
+        from utils import logger as logger_module
+        monkeypatch.setattr(logger_module, '_log_listeners', {})
+        
+        paths = [tmp_path / "first.log", tmp_path / "second.log"]
+        for path in paths:
+            file_handler = logging.FileHandler(path, delay=True)
+            queue_handler = logger_module._get_queue_handler(file_handler)
+            queue_handler.handle(logging.makeLogRecord({'msg': path.name, 'levelno': logging.INFO}))
+        
+        # Same destination reuses the running listener
+        logger_module._get_queue_handler(logging.FileHandler(paths[0], delay=True))
+        assert len(logger_module._log_listeners) == 2
+        
+        logger_module._stop_log_listeners()
+        for path in paths:
+            assert path.read_text().strip() == path.name
 
 
 class TestIntegratedPerformance:
@@ -318,7 +435,7 @@ class TestIntegratedPerformance:
         
         num_iterations = 10
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         for i in range(num_iterations):
             # Record request
@@ -336,7 +453,7 @@ class TestIntegratedPerformance:
             cached_result = cache_manager.get(cache_key)
             assert cached_result == rendered
         
-        end_time = time.time()
+        end_time = time.perf_counter()
         total_time = end_time - start_time
         
         # Should process 10 iterations quickly
@@ -355,8 +472,9 @@ class TestIntegratedPerformance:
         import psutil
         import gc
         
-        # Get initial memory usage
+        # Get initial memory usage from a collected heap
         process = psutil.Process()
+        gc.collect()
         initial_memory = process.memory_info().rss / 1024 / 1024  # MB
         
         # Perform many operations
@@ -364,19 +482,14 @@ class TestIntegratedPerformance:
             # Template operations
             template = template_service.get_template('business_letter')
             if template:
-                content_data = {placeholder.key: placeholder.placeholder_text 
-                              for placeholder in template.placeholders}
-                rendered = template_service.render_template('business_letter', content_data)
+                rendered = template_service.render_template('business_letter')
                 
                 # Cache operations
                 cache_manager.set(f"memory_test_{i}", rendered, ttl=60)
                 cache_manager.get(f"memory_test_{i}")
-            
-            # Force garbage collection every 10 iterations
-            if i % 10 == 0:
-                gc.collect()
         
-        # Get final memory usage
+        # Collect once at the boundary so only retained memory is measured
+        gc.collect()
         final_memory = process.memory_info().rss / 1024 / 1024  # MB
         memory_increase = final_memory - initial_memory
         
@@ -385,7 +498,7 @@ class TestIntegratedPerformance:
     
     def test_error_handling_performance(self, template_service, performance_monitor):
         """Test performance impact of error handling."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Test various error conditions
         for i in range(50):
@@ -400,7 +513,7 @@ class TestIntegratedPerformance:
             # Record error
             performance_monitor.record_error(f"Test error {i}")
         
-        end_time = time.time()
+        end_time = time.perf_counter()
         error_handling_time = end_time - start_time
         
         # Error handling should not significantly impact performance
@@ -62,6 +62,15 @@ class TestHTMLSanitization:
         assert "javascript:" not in sanitized
         assert "Content" in sanitized
     
+    def test_style_attribute_helper(self, html_sanitizer):
+        """Test the style attribute helper keeps allowed declarations only."""
+        style = "COLOR: #333; position: static; font-size: 14px; width: wide"
+        assert html_sanitizer.sanitize_style_attribute(style) == ""
+        
+        style = "COLOR: #333; z-index: 9; font-size: 14px; width: wide"
+        assert html_sanitizer.sanitize_style_attribute(style) == "color: #333; font-size: 14px"
+        assert html_sanitizer.sanitize_style_attribute("background: URL(x.png)") == ""
+    
     def test_comprehensive_xss_protection(self, html_sanitizer, malicious_html):
         """Test comprehensive XSS protection with complex malicious HTML."""
         sanitized = html_sanitizer.sanitize(malicious_html)
@@ -72,8 +81,9 @@ class TestHTMLSanitization:
             "alert", "XSS", "<iframe>"
         ]
         
+        sanitized_lower = sanitized.lower()
         for pattern in dangerous_patterns:
-            assert pattern not in sanitized.lower()
+            assert pattern not in sanitized_lower
         
         # Ensure safe content remains
         assert "Test Heading" in sanitized
@@ -84,12 +94,140 @@ class TestHTMLSanitization:
         assert html_sanitizer.sanitize(None) == ""
         assert html_sanitizer.sanitize("   ") == "   "
     
+    def test_plain_text_skips_parser(self, monkeypatch):
+        """Test multi-line plain text is returned without an HTML parse."""
+        sanitizer = HTMLSanitizer(SecurityConfig())
+        monkeypatch.setattr(sanitizer, '_clean', lambda content: pytest.fail("parsed plain text"))
+        
+        text = "First line\n\n\tIndented  line; a = b (c)"
+        assert sanitizer.sanitize(text) == text
+    
     def test_nested_attack_prevention(self, html_sanitizer):
         """Test prevention of nested XSS attacks."""
         nested_attack = '<p><<script>script>alert("XSS")<</script>/script></p>'
         sanitized = html_sanitizer.sanitize(nested_attack)
         assert "<script>" not in sanitized
         assert "alert" not in sanitized
+    
+    def test_backends_agree(self, monkeypatch, template_service):
+        """Test the nh3 and bleach backends agree on representative content."""
+        from utils import sanitizers
+        if not sanitizers.NH3_AVAILABLE:
+            pytest.skip("nh3 not installed")
+        
+        corpus = [
+            '<div><h1>T &amp; C</h1><p>a<br>b <a href="https://x.org">l</a></p>'
+            '<p> </p><ul><li>1</li><li><span></span></li></ul><!-- c --></div>',
+            '<p>x&nbsp;y</p>',
+            '<p>unclosed <em>tag',
+            '<table><tr><td>cell</td></tr></table>',
+            '<p>ok</p><script>alert(1)</script>',
+            '<iframe src="https://x.org">inner text</iframe><p>ok</p>',
+            '<p onclick="x()" style="color:red" title="t">attrs</p>',
+            '<a href="javascript:alert(1)">js</a><img src="x.png" alt="a">',
+        ]
+        for template in template_service.get_template_library().templates.values():
+            corpus.extend(p.placeholder_text for p in template.placeholders)
+            corpus.extend(template.sample_content.values())
+        
+        nh3_sanitizer = HTMLSanitizer(SecurityConfig())
+        monkeypatch.setattr(sanitizers, 'NH3_AVAILABLE', False)
+        bleach_sanitizer = HTMLSanitizer(SecurityConfig())
+        
+        for html in corpus:
+            assert nh3_sanitizer.sanitize(html) == bleach_sanitizer.sanitize(html), html
+        assert '<a href="https://x.org" rel="nofollow">l</a>' in nh3_sanitizer.sanitize(corpus[0])
+        
+        # Documented differences between the two parsers
+        known_differences = {
+            '<p>a\xa0b</p>': ('<p>a&nbsp;b</p>', '<p>a\xa0b</p>'),
+            '<style>p{color:red}</style><p>x</p>': ('<p>x</p>', 'p{color:red}<p>x</p>'),
+            '<iframe><b>hi</b></iframe><p>ok</p>': (
+                '&lt;b&gt;hi&lt;/b&gt;<p>ok</p>', 'hi<p>ok</p>'
+            ),
+        }
+        for html, (nh3_expected, bleach_expected) in known_differences.items():
+            assert nh3_sanitizer.sanitize(html) == nh3_expected
+            assert bleach_sanitizer.sanitize(html) == bleach_expected
+    
+    def test_repeated_input_is_memoized(self):
+        """Test repeated inputs are served from the sanitizer's cache."""
+        sanitizer = HTMLSanitizer(SecurityConfig())
+        html = '<p onclick="x()">Repeated <em>content</em></p>'
+        
+        first = sanitizer.sanitize(html)
+        assert sanitizer.sanitize(html) == first
+        assert sanitizer._sanitize_cached.cache_info().hits == 1
+        
+        with pytest.raises(ValueError):
+            sanitizer.sanitize("x" * (sanitizer.config.max_text_length + 1))
+    
+    @pytest.mark.performance
+    def test_cleanup_patterns_are_linear(self, html_sanitizer):
+        """Test unterminated attack prefixes don't trigger quadratic matching."""
+        from utils import sanitizers
+        if not sanitizers.RE2_AVAILABLE:
+            pytest.skip("re2 not installed")
+        
+        import time
+        hostile = "<b onclick=x>" + "alert(" * 20000 + " onx" * 20000
+        
+        start_time = time.perf_counter()
+        html_sanitizer.sanitize(hostile)
+        assert time.perf_counter() - start_time < 1.0
+    
+    def test_cleanup_prefilter(self, monkeypatch):
+        """Test the Hyperscan prefilter flags every cleanup pattern and skips clean text."""
+        from utils import sanitizers
+        
+        # Without a database every input goes to the regexes
+        monkeypatch.setattr(sanitizers, '_CLEANUP_DATABASE', None)
+        assert sanitizers._needs_cleanup("plain text")
+        
+        if not sanitizers.HYPERSCAN_AVAILABLE:
+            pytest.skip("hyperscan not installed")
+        
+        monkeypatch.setattr(sanitizers, '_CLEANUP_DATABASE', sanitizers._build_cleanup_database())
+        assert sanitizers._CLEANUP_DATABASE is not None
+        
+        for content in ['<SCRIPT>x</script>', 'alert (1)', '<a onclick="x">', 'JavaScript:go',
+                        '<iframe src=x></iframe>', 'document.cookie', 'caf\u00e9 xss']:
+            assert sanitizers._needs_cleanup(content), content
+        assert not sanitizers._needs_cleanup("<p>Quarterly caf\u00e9 report</p>")
+
+
+class TestCSSSanitization:
+    """Test CSS sanitization for style content."""
+    
+    def test_control_characters_cannot_hide_urls(self):
+        """Test BOM and C1 characters are stripped before the url() allowlist runs."""
+        from utils.css_sanitizer import sanitize_css
+        
+        assert sanitize_css('background: ,\ufeffurl(//evil.com/x.png)') == 'background: ,'
+        assert sanitize_css('background-image: \x85url(ftp://evil/x)') == ''
+        assert sanitize_css('color: r\x85ed') == 'color: red'
+    
+    def test_instances_keep_their_own_allow_list(self):
+        """Test a customized sanitizer is not served the shared instance's results."""
+        from utils.css_sanitizer import CSSSanitizer, sanitize_css
+        
+        css = 'color: red; width: 10px'
+        assert sanitize_css(css) == 'color: red; width: 10px'
+        
+        narrow = CSSSanitizer()
+        narrow.allowed_properties = frozenset({'color'})
+        assert narrow.sanitize_css(css) == 'color: red'
+        assert narrow.sanitize_css('p { color: red; width: 1px }') == 'p { color: red }'
+    
+    def test_blocked_input_is_logged_every_time(self, caplog):
+        """Test repeated dangerous CSS is reported on every call, not only the first."""
+        from utils.css_sanitizer import sanitize_css
+        
+        with caplog.at_level('WARNING', logger='utils.css_sanitizer'):
+            for _ in range(3):
+                assert sanitize_css('color: expression(alert(1))') == ''
+        
+        assert sum('Dangerous CSS' in record.message for record in caplog.records) == 3
 
 
 class TestContentValidation:
@@ -212,6 +350,15 @@ class TestInputValidation:
             is_valid, error = validator.validate_file_path(path)
             assert not is_valid
             assert "path" in error.lower()
+    
+    def test_plain_file_paths_accepted(self):
+        """Test bare filenames pass path validation, including ones with colons."""
+        validator = FileValidator()
+        
+        for path in ["report.docx", "notes 10:30.txt"]:
+            is_valid, error = validator.validate_file_path(path)
+            assert is_valid, path
+            assert error is None
 
 
 class TestSecurityConfiguration:
@@ -237,6 +384,16 @@ class TestSecurityConfiguration:
         assert 'txt' in config.allowed_file_types
         assert 'pdf' not in config.allowed_file_types
     
+    def test_default_config_is_shared(self):
+        """Test components built without a config share one default instance."""
+        from models.style_models import get_default_security_config
+        from utils.sanitizers import get_default_sanitizer
+        
+        default_config = get_default_security_config()
+        assert ContentValidator().config is default_config
+        assert get_default_sanitizer().config is default_config
+        assert ContentValidator(SecurityConfig(max_text_length=10)).config is not default_config
+    
     def test_blocked_patterns_configuration(self):
         """Test blocked patterns in security configuration."""
         config = SecurityConfig()
@@ -289,6 +446,7 @@ class TestSecurityIntegration:
         assert "<h1>" in sanitized
         assert "<div>" in sanitized
     
+    @pytest.mark.performance
     def test_security_performance(self, html_sanitizer):
         """Test security processing performance."""
         import time
@@ -303,9 +461,9 @@ class TestSecurityIntegration:
         </div>
         """
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         sanitized = html_sanitizer.sanitize(large_content)
-        end_time = time.time()
+        end_time = time.perf_counter()
         
         processing_time = end_time - start_time
         
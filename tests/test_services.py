@@ -8,7 +8,7 @@ import os
 from services.template_service import TemplateService
 from services.html_generator import HTMLGenerator
 from services.file_processor import FileProcessor
-from models.template_models import TemplateCategory
+from models.template_models import Template, TemplateCategory
 from models.style_models import StyleConfig, SecurityConfig
 from utils.sanitizers import HTMLSanitizer
 from utils.validators import FileValidator
@@ -89,6 +89,19 @@ class TestTemplateService:
         assert 'John Doe' in rendered
         assert 'Test Subject' in rendered
     
+    def test_render_template_defaults(self, template_service):
+        """Test rendering a template without content uses its placeholder defaults."""
+        template = template_service.get_template('business_letter')
+        defaults = {p.key: p.placeholder_text for p in template.placeholders}
+        assert dict(template.default_content) == defaults
+        assert template_service.render_template('business_letter') == template.render(defaults)
+    
+    def test_default_templates_are_valid(self, template_service):
+        """Test built-in templates survive a validation round trip unchanged."""
+        for template in template_service.get_template_library().templates.values():
+            data = template.model_dump()
+            assert Template.model_validate(data).model_dump() == data
+    
     def test_render_template_validation_failure(self, template_service):
         """Test template rendering with invalid content."""
         # Try to render without required content
@@ -296,6 +309,7 @@ class TestServiceIntegration:
                 assert 'Safe content' in final_html
 
 
+@pytest.mark.performance
 class TestPerformanceAndScaling:
     """Test performance and scaling characteristics."""
     
@@ -303,9 +317,9 @@ class TestPerformanceAndScaling:
         """Test template loading performance."""
         import time
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         service = TemplateService()
-        end_time = time.time()
+        end_time = time.perf_counter()
         
         loading_time = end_time - start_time
         
@@ -320,9 +334,9 @@ class TestPerformanceAndScaling:
         generator = HTMLGenerator(style_config)
         large_content = "<p>Content paragraph. " * 1000 + "</p>"
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         html_doc = generator.generate_html_document(large_content)
-        end_time = time.time()
+        end_time = time.perf_counter()
         
         generation_time = end_time - start_time
         
@@ -361,14 +375,14 @@ class TestPerformanceAndScaling:
             threads.append(thread)
         
         # Start all threads
-        start_time = time.time()
+        start_time = time.perf_counter()
         for thread in threads:
             thread.start()
         
         # Wait for completion
         for thread in threads:
             thread.join()
-        end_time = time.time()
+        end_time = time.perf_counter()
         
         # Verify results
         assert len(errors) == 0, f"Errors occurred: {errors}"
@@ -377,4 +391,26 @@ class TestPerformanceAndScaling:
         
         # Should complete within reasonable time
         total_time = end_time - start_time
-        assert total_time < 5.0
\ No newline at end of file
+        assert total_time < 5.0
+    
+    def test_render_many(self, template_service):
+        """Test batch rendering returns one document per content dict, in order."""
+        template = template_service.get_template('business_letter')
+        if not template:
+            pytest.skip("Business letter template not available")
+        
+        # Prepare content, one distinct dict per render
+        content_list = []
+        for i in range(5):
+            content_data = {}
+            for placeholder in template.placeholders:
+                content_data[placeholder.key] = placeholder.placeholder_text
+            content_data['company_name'] = f"Company {i}"
+            content_list.append(content_data)
+        
+        results = template_service.render_many('business_letter', content_list)
+        
+        assert len(results) == 5
+        assert all(result is not None for result in results)
+        assert all(f"Company {i}" in result for i, result in enumerate(results))
+        assert template_service.render_many('missing_template', [{}]) == [None]